@@ -0,0 +1,224 @@
+"""
+Dynamixel Bus Scanner (Protocol 1.0)
+
+Finds every servo on one or more FTDI adapters: sweeps the standard baud
+rates, PINGs IDs 0-253 with a timeout derived from the wire turnaround
+(and the adapter's USB latency timer) instead of a fixed 20 ms, and reads
+model/firmware only for the IDs that answered. Several adapters are
+scanned in parallel (one process per port).
+
+Protocol 1.0 servos never answer the broadcast ID, not even to PING, so
+there is no cheap "anything at this baud?" probe: every ID is PINGed.
+Use --ids and --first to keep the sweep short.
+
+The JSON inventory it writes can be loaded by the web backend at startup:
+
+    python dxl_scanner.py --ports /dev/ttyUSB0,/dev/ttyUSB1 -o inventory.json
+    DXL_INVENTORY=inventory.json uvicorn app:app
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import serial
+from serial.tools import list_ports
+
+# Packet builders/decoders are shared with the web backend
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "ui_ux_webapp" / "back_end"))
+from dxl_protocol import decode_status, pkt_ping, pkt_read
+
+# ------ Configuration ------
+# Baud Rate register values (AX/MX): 1 → 1 Mbps, 3 → 500 kbps, ... 207 → 9.6 kbps
+BAUDS = [1_000_000, 500_000, 400_000, 250_000, 200_000, 117_647, 57_600, 19_200, 9_600]
+IDS = range(0, 254)                   # 254 = broadcast, never answers as itself
+MAX_RETURN_DELAY = 254 * 2e-6         # worst-case Return Delay Time register (508 µs)
+USB_LATENCY = 0.017                   # FTDI default latency timer (16 ms) + scheduling slack
+USB_SLACK = 0.001
+FTDI_VID = 0x0403
+
+MODEL_NAMES = {
+    0x000C: "AX-12A",
+    0x0012: "AX-18A",
+    0x012C: "AX-12W",
+    0x001D: "MX-28",
+    0x0136: "MX-64",
+    0x0140: "MX-106",
+}
+
+
+def turnaround(baud: int, tx_len: int, rx_len: int, usb_latency: float = USB_LATENCY) -> float:
+    """Tightest safe timeout: both packets on the wire + Return Delay + USB latency."""
+    return (tx_len + rx_len) * 10 / baud + MAX_RETURN_DELAY + usb_latency
+
+
+def usb_latency_for(port: str) -> float:
+    """USB latency to budget for `port`: the FTDI latency timer from sysfs
+    (Linux) plus slack, or the 16 ms driver default when it cannot be read."""
+    name = os.path.basename(os.path.realpath(port))
+    try:
+        with open(f"/sys/bus/usb-serial/devices/{name}/latency_timer") as f:
+            return int(f.read()) / 1e3 + USB_SLACK
+    except (OSError, ValueError):
+        return USB_LATENCY
+
+
+class Link:
+    """Half-duplex FTDI link (DTR = direction; absent on ptys/auto-direction boards)."""
+
+    def __init__(self, port: str, baud: int, usb_latency: float = USB_LATENCY):
+        self.ser = serial.Serial(port, baud, timeout=0.02)
+        self.usb_latency = usb_latency
+        try:
+            self.ser.dtr = True
+            self.dtr = True
+        except OSError:
+            self.dtr = False
+
+    def close(self):
+        self.ser.close()
+
+    def set_baud(self, baud: int):
+        self.ser.baudrate = baud
+
+    def txrx(self, packet: bytes, expect: int, timeout: float) -> bytes:
+        """Send `packet` and read up to `expect` bytes within `timeout` seconds."""
+        ser = self.ser
+        if self.dtr:
+            ser.dtr = False
+        ser.reset_input_buffer()
+        ser.write(packet)
+        ser.flush()
+        while ser.out_waiting:
+            pass
+        time.sleep(0.00005)
+        if self.dtr:
+            ser.dtr = True
+        if ser.timeout != timeout:
+            ser.timeout = timeout
+        return ser.read(expect)
+
+    def ping(self, dxl_id: int) -> bool:
+        t = turnaround(self.ser.baudrate, 6, 6, self.usb_latency)
+        status = decode_status(self.txrx(pkt_ping(dxl_id), 6, t))
+        return status is not None and status.id == dxl_id
+
+    def model(self, dxl_id: int) -> Optional[Dict[str, object]]:
+        """Model Number (0-1) + Firmware Version (2), with a couple of retries."""
+        t = turnaround(self.ser.baudrate, 8, 9, self.usb_latency)
+        for _ in range(3):
+            status = decode_status(self.txrx(pkt_read(dxl_id, 0x00, 3), 9, t))
+            if status is not None and status.id == dxl_id and len(status.params) == 3:
+                model = status.params[0] | (status.params[1] << 8)
+                return {"model": model, "model_name": MODEL_NAMES.get(model, "unknown"),
+                        "firmware": status.params[2]}
+        return None
+
+
+def scan_port(port: str, bauds: Sequence[int] = BAUDS, ids: Sequence[int] = IDS,
+              first_only: bool = False,
+              usb_latency: Optional[float] = None) -> Dict[str, object]:
+    """Scan one adapter. Returns {"port", "buses": [{"baud", "servos"}], "elapsed_s"}.
+    `usb_latency` None → read the adapter's latency timer (usb_latency_for)."""
+    t0 = time.monotonic()
+    out: Dict[str, object] = {"port": port, "buses": []}
+    if usb_latency is None:
+        usb_latency = usb_latency_for(port)
+    out["usb_latency_ms"] = round(usb_latency * 1e3, 1)
+    try:
+        link = Link(port, bauds[0], usb_latency)
+    except (serial.SerialException, OSError) as e:
+        out["error"] = str(e)
+        return out
+    try:
+        for baud in bauds:
+            link.set_baud(baud)
+            found = [i for i in ids if link.ping(i)]
+            servos = []
+            for dxl_id in found:
+                info = link.model(dxl_id) or {"model": None, "model_name": "unknown",
+                                              "firmware": None}
+                servos.append({"id": dxl_id, **info})
+            if servos:
+                out["buses"].append({"baud": baud, "servos": servos})
+                if first_only:
+                    break
+    except (serial.SerialException, OSError) as e:
+        out["error"] = str(e)
+    finally:
+        link.close()
+    out["elapsed_s"] = round(time.monotonic() - t0, 3)
+    return out
+
+
+def scan(ports: Sequence[str], **kwargs) -> Dict[str, object]:
+    """Scan every port in parallel (one process each) and merge into an inventory."""
+    if len(ports) == 1:
+        results = [scan_port(ports[0], **kwargs)]
+    else:
+        with ProcessPoolExecutor(max_workers=len(ports)) as pool:
+            futures = [pool.submit(scan_port, p, **kwargs) for p in ports]
+            results = [f.result() for f in futures]
+    return {"scanned_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "ports": results}
+
+
+def default_ports() -> List[str]:
+    """FTDI adapters currently attached."""
+    return [p.device for p in list_ports.comports() if p.vid == FTDI_VID]
+
+
+def parse_ids(spec: str) -> List[int]:
+    """'1-6,10' → [1, 2, 3, 4, 5, 6, 10]"""
+    ids: List[int] = []
+    for part in spec.split(","):
+        if "-" in part:
+            lo, hi = part.split("-")
+            ids += range(int(lo), int(hi) + 1)
+        elif part:
+            ids.append(int(part))
+    return [i for i in ids if 0 <= i <= 253]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fast Dynamixel Protocol 1.0 bus scanner")
+    ap.add_argument("--ports", default="", help="CSV of serial ports (default: all FTDI adapters)")
+    ap.add_argument("--bauds", default=",".join(map(str, BAUDS)))
+    ap.add_argument("--ids", default="0-253", help="e.g. 1-6,10")
+    ap.add_argument("--first", action="store_true", help="stop at the first baud with servos")
+    ap.add_argument("--usb-latency", type=float, default=None,
+                    help="ms (default: the adapter's latency_timer, else 16 ms + slack)")
+    ap.add_argument("-o", "--output", default="-", help="inventory JSON file ('-' = stdout)")
+    args = ap.parse_args()
+
+    ports = [p for p in args.ports.split(",") if p] or default_ports()
+    if not ports:
+        sys.exit("No serial ports found (use --ports)")
+    t0 = time.monotonic()
+    inv = scan(ports, bauds=[int(b) for b in args.bauds.split(",")], ids=parse_ids(args.ids),
+               first_only=args.first,
+               usb_latency=None if args.usb_latency is None else args.usb_latency / 1e3)
+
+    for res in inv["ports"]:
+        if "error" in res:
+            print(f"⛔ {res['port']}: {res['error']}", file=sys.stderr)
+        for bus in res["buses"]:
+            for s in bus["servos"]:
+                print(f"✅ {res['port']} @ {bus['baud']}: ID {s['id']} → {s['model_name']}",
+                      file=sys.stderr)
+    print(f"Scanned {len(ports)} port(s) in {time.monotonic() - t0:.2f} s", file=sys.stderr)
+
+    text = json.dumps(inv, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
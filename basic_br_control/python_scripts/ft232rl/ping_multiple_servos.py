@@ -8,15 +8,23 @@ Author: Santiago S. Sánchez
 Date: 2025-07-08
 """
 
-import serial
-import time
 import binascii
+import sys
+import time
+from pathlib import Path
+
+import serial
+
+# Packet builders/decoders are shared with the web backend
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "ui_ux_webapp" / "back_end"))
+from dxl_protocol import decode_status, pkt_read
 
 # ------ Configuration ------
 PORT = '/dev/tty.usbserial-A5XK3RJT'  # FTDI serial port (adjust for your device)
 BAUD = 1_000_000                      # 1 Mbps communication speed
 IDS = [1, 2, 3, 4, 5, 6]              # Servo IDs to scan
 TIMEOUT = 0.02                        # 20ms response timeout
+MODEL_ADDR = 0x00                     # Model Number (2 bytes, little-endian)
 
 # Known model numbers (hex) and their human-readable names
 MODEL_NAMES = {
@@ -25,44 +33,6 @@ MODEL_NAMES = {
     0x012C: "AX-12W",
 }
 
-def tx_cs(packet: list) -> int:
-    """
-    Calculate transmission checksum for Dynamixel Protocol 1.0.
-    
-    Args:
-        packet: List of bytes in packet (excluding leading 0xFF 0xFF)
-    
-    Returns:
-        Checksum byte
-    """
-    return (~sum(packet[2:]) & 0xFF)
-
-def rx_cs(response: bytes) -> int:
-    """
-    Calculate received packet checksum for validation.
-    
-    Args:
-        response: Full received packet (including headers)
-    
-    Returns:
-        Calculated checksum byte for comparison
-    """
-    return (~sum(response[2:-1]) & 0xFF)
-
-def pkt_read_model(dxl_id: int) -> bytes:
-    """
-    Generate a model number read request packet.
-    
-    Args:
-        dxl_id: Servo ID to query
-    
-    Returns:
-        Ready-to-transmit packet bytes
-    """
-    p = [0xFF, 0xFF, dxl_id, 0x04, 0x02, 0x00, 0x02]  # Instruction: READ_DATA
-    p.append(tx_cs(p))
-    return bytes(p)
-
 def main():
     """Execute the Dynamixel servo scanning routine."""
     print(f"Scanning IDs {IDS} at {BAUD/1_000_000} Mbps...")
@@ -72,8 +42,7 @@ def main():
             # ----- Transmission Phase -----
             ser.dtr = False  # FTDI LED ON indicates TX mode
             ser.reset_input_buffer()
-            pkt = pkt_read_model(dxl_id)
-            ser.write(pkt)
+            ser.write(pkt_read(dxl_id, MODEL_ADDR, 2))  # cached per ID
             ser.flush()
             while ser.out_waiting:  # Wait for transmission to complete
                 pass
@@ -82,11 +51,11 @@ def main():
             # ----- Reception Phase -----
             ser.dtr = True  # FTDI LED OFF indicates RX mode
             resp = ser.read(8)  # Expected response length
+            status = decode_status(resp)
 
-            if (len(resp) == 8 and resp[:2] == b'\xFF\xFF' 
-                and rx_cs(resp) == resp[-1]):
+            if status is not None and len(status.params) == 2:
                 # Successful response
-                model = resp[5] | (resp[6] << 8)
+                model = int.from_bytes(status.params, "little")
                 name = MODEL_NAMES.get(model, "unknown")
                 print(f"✅ ID {dxl_id}: Model 0x{model:04X} → {name}")
             else:
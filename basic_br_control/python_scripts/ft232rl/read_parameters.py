@@ -8,8 +8,16 @@ Author: Santiago S. Sánchez
 Date: 2025-07-08
 """
 
-import serial
+import sys
 import time
+from pathlib import Path
+from typing import Optional
+
+import serial
+
+# Packet builders/decoders are shared with the web backend
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "ui_ux_webapp" / "back_end"))
+from dxl_protocol import decode_status, pkt_read
 
 # ------ Configuration ------
 PORT = '/dev/tty.usbserial-A5XK3RJT'  # FTDI serial port
@@ -28,51 +36,7 @@ ADDR = {
     'PRESENT_TEMP': 43
 }
 
-def tx_checksum(packet: list) -> int:
-    """Calculate transmission checksum for Dynamixel packets.
-    
-    Args:
-        packet: Byte list excluding 0xFF headers
-        
-    Returns:
-        Checksum byte
-    """
-    return (~sum(packet[2:])) & 0xFF
-
-def rx_checksum(response: list) -> int:
-    """Verify received packet checksum.
-    
-    Args:
-        response: Full received packet including headers
-        
-    Returns:
-        Calculated checksum for verification
-    """
-    return (~sum(response[2:-1])) & 0xFF
-
-def create_read_packet(servo_id: int, address: int, length: int) -> bytes:
-    """Generate a parameter read request packet.
-    
-    Args:
-        servo_id: Target servo ID
-        address: Control table address
-        length: Bytes to read
-        
-    Returns:
-        Ready-to-transmit packet
-    """
-    packet = [
-        0xFF, 0xFF,           # Header
-        servo_id,             # ID
-        0x04,                  # Packet length
-        0x02,                  # READ_DATA instruction
-        address & 0xFF,        # Address LSB
-        length & 0xFF          # Data length
-    ]
-    packet.append(tx_checksum(packet))
-    return bytes(packet)
-
-def read_parameter(ser: serial.Serial, servo_id: int, address: int, length: int) -> list:
+def read_parameter(ser: serial.Serial, servo_id: int, address: int, length: int) -> Optional[bytes]:
     """Read a parameter from servo's control table.
     
     Args:
@@ -82,13 +46,12 @@ def read_parameter(ser: serial.Serial, servo_id: int, address: int, length: int)
         length: Expected data length
         
     Returns:
-        List of received bytes or None if failed
+        Received data bytes or None if failed
     """
     # Transmission phase
     ser.dtr = False  # FTDI LED ON = TX mode
     ser.reset_input_buffer()
-    packet = create_read_packet(servo_id, address, length)
-    ser.write(packet)
+    ser.write(pkt_read(servo_id, address, length))  # cached per (id, addr, len)
     ser.flush()
     while ser.out_waiting:  # Ensure transmission completes
         pass
@@ -97,11 +60,10 @@ def read_parameter(ser: serial.Serial, servo_id: int, address: int, length: int)
     # Reception phase
     ser.dtr = True  # FTDI LED OFF = RX mode
     response = ser.read(6 + length)  # Header(2)+ID(1)+Len(1)+Err(1)+Data(n)+CS(1)
-    
-    if (len(response) == 6 + length and 
-        response[:2] == b'\xFF\xFF' and 
-        rx_checksum(response) == response[-1]):
-        return list(response[5:5+length])
+
+    status = decode_status(response)
+    if status is not None and len(status.params) == length:
+        return status.params
     return None
 
 def format_load(raw: int) -> str:
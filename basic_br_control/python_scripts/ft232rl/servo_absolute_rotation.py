@@ -8,8 +8,15 @@ Author: Santiago S. Sánchez
 Date: 2025-07-08
 """
 
-import serial
+import sys
 import time
+from pathlib import Path
+
+import serial
+
+# Packet builders/decoders are shared with the web backend
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "ui_ux_webapp" / "back_end"))
+from dxl_protocol import decode_status, pkt_write
 
 # ------ Configuration ------
 PORT = '/dev/tty.usbserial-A5XK3RJT'  # FTDI serial port
@@ -23,17 +30,6 @@ TIMEOUT = 0.005                       # 5ms response timeout
 GOAL_POSITION_ADDR = 30               # Address for goal position
 STATUS_PACKET_LEN = 6                 # Expected status packet length
 
-def calculate_checksum(packet: list) -> int:
-    """Calculate Dynamixel Protocol 1.0 checksum.
-    
-    Args:
-        packet: Byte list excluding 0xFF headers
-        
-    Returns:
-        Checksum byte
-    """
-    return (~sum(packet[2:])) & 0xFF
-
 def degrees_to_units(angle_deg: float, resolution: int = 1023) -> int:
     """Convert degrees to Dynamixel position units.
     
@@ -46,29 +42,6 @@ def degrees_to_units(angle_deg: float, resolution: int = 1023) -> int:
     """
     return int(angle_deg * resolution / 300.0 + 0.5)  # Rounded to nearest integer
 
-def create_position_packet(servo_id: int, position: int) -> bytes:
-    """Generate position command packet.
-    
-    Args:
-        servo_id: Target servo ID
-        position: Goal position in servo units
-        
-    Returns:
-        Ready-to-transmit packet bytes
-    """
-    position_low = position & 0xFF
-    position_high = (position >> 8) & 0xFF
-    packet = [
-        0xFF, 0xFF,               # Header
-        servo_id,                 # Servo ID
-        0x05,                      # Packet length
-        0x03,                      # WRITE_DATA instruction
-        GOAL_POSITION_ADDR,        # Address
-        position_low, position_high  # Position data
-    ]
-    packet.append(calculate_checksum(packet))
-    return bytes(packet)
-
 def main():
     """Execute position control routine."""
     goal_units = degrees_to_units(ANGLE_DEG, DXL_RES)
@@ -78,7 +51,7 @@ def main():
         # Transmission phase
         ser.dtr = False  # FTDI LED ON = TX mode
         ser.reset_input_buffer()
-        command = create_position_packet(DXL_ID, goal_units)
+        command = pkt_write(DXL_ID, GOAL_POSITION_ADDR, goal_units & 0xFF, (goal_units >> 8) & 0xFF)
         ser.write(command)
         ser.flush()
         while ser.out_waiting:  # Wait for transmission to complete
@@ -90,10 +63,9 @@ def main():
         status = ser.read(STATUS_PACKET_LEN)
 
     # Result analysis
-    if (len(status) == STATUS_PACKET_LEN and 
-        status[:2] == b'\xFF\xFF' and 
-        calculate_checksum(status) == status[-1]):
-        error_code = status[4]
+    reply = decode_status(status)
+    if reply is not None:
+        error_code = reply.error
         if error_code == 0:
             print("✅ Movement accepted (no errors)")
         else:
@@ -1,80 +1,149 @@
 """
 app.py — FastAPI  + Dynamixel (Protocol 1.0)
 Versión “elegante”: un solo endpoint /api/inspect que devuelve la lista
-completa y un lock global para evitar colisiones en el puerto serie.
-Compatible con Python 3.9
+completa y buses persistentes (dxl_bus.DxlBus) que abren el puerto una vez,
+serializan el acceso y se reconectan solos si se pierde el adaptador.
+Con varios FTDI (DXL_BUSES o inventario) cada bus va en paralelo (bus_router).
+Endpoints async: la E/S serie la hace un único hilo (AsyncDxlBus) y las
+peticiones HTTP no ocupan hilos del threadpool mientras esperan al bus.
+Compatible con Python 3.9; dependencias en requirements.txt (incluye numpy).
 ────────────────────────────────────────────────────────────────────────
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from contextlib import contextmanager
-from typing import List, Optional
-import os, serial, time, threading
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Literal, Optional
+import asyncio, math, os, time
+import numpy as np
+
+from dxl_bus import BusUnavailable, Stopped, URGENT
+from bus_router import DxlRouter, parse_buses
+from servo_health import HealthMonitor
+from dxl_protocol import BROADCAST, pkt_reg_write, pkt_action, pkt_sync_write
+from control_table import ADDR, MAX_READ, plan_reads, decode_span
+from telemetry import TelemetryPoller, parse_ids
+from inventory import load_inventory
+from history import HistoryStore
+from streaming import TelemetryStream, MAX_RATE, parse_sub, sse_event
+from trajectory import TrajectoryRunner, plan_trajectory, MAX_DURATION
+from coalescer import GoalCoalescer
+from metrics import REGISTRY, DXL_WIRE, HTTP_LATENCY, Gauge
+import kinematics
 
 # ───────────── Config ─────────────
-PORT       = os.getenv("DXL_PORT", "/dev/tty.usbserial-A5XK3RJT")
-BAUD       = int(os.getenv("DXL_BAUD", 1_000_000))
+INVENTORY  = load_inventory(os.getenv("DXL_INVENTORY", ""))   # salida de dxl_scanner.py
+_INV       = INVENTORY[0] if INVENTORY else None
+PORT       = os.getenv("DXL_PORT") or (_INV.port if _INV else "/dev/tty.usbserial-A5XK3RJT")
+BAUD       = int(os.getenv("DXL_BAUD") or (_INV.baud if _INV else 1_000_000))
 TIMEOUT    = 0.02           # 20 ms
 DXL_RES    = 1023
 GOAL_POS   = 30             # Goal Position
 TORQUE_EN  = 24             # Torque Enable
+MOV_SPEED  = 32             # Moving Speed
+SYNC_MAX   = 50             # filas de 4 B que caben en un SYNC_WRITE (len ≤ 255)
 STATUS_LEN = 6
+# "puerto[@baudios]=ids;..." > DXL_PORT solo > todos los buses del inventario > PORT
+BUSES      = parse_buses(os.getenv("DXL_BUSES", ""), BAUD) or \
+             ([] if os.getenv("DXL_PORT") else
+              [(b.port, b.baud, sorted(b.servos)) for b in INVENTORY]) or [(PORT, BAUD, [])]
+POLL_IDS   = os.getenv("DXL_POLL_IDS") or \
+             (",".join(str(i) for _,_,ids in BUSES for i in ids) or "1,2,3,4")   # IDs del barrido
+POLL_HZ    = float(os.getenv("DXL_POLL_HZ", 5))      # 0 = sin poller
+MAX_AGE    = 1.0            # s, antigüedad por defecto servida desde caché
+BULK_READ  = os.getenv("DXL_BULK_READ", "1" if INVENTORY and all(b.all_mx for b in INVENTORY)
+                       else "0") == "1"   # solo serie MX
+BULK_MAX   = 84             # tramos que caben en un BULK_READ (len ≤ 255)
+HISTORY_DIR= os.getenv("DXL_HISTORY_DIR",                 # "" = sin historial
+                       os.path.join(os.path.dirname(os.path.abspath(__file__)), "history_data"))
+HISTORY_LEN= int(os.getenv("DXL_HISTORY_LEN", 144_000))   # muestras por servo (8 h a 5 Hz)
+ARM_IDS    = [1, 2, 3]      # base, hombro, codo (ver front_end/src/lib/utils.ts)
+GRIPPER_ID = 4
+MOVE_HZ    = float(os.getenv("DXL_MOVE_HZ", 100))     # tope de envíos de /api/move coalescidos
+RECORD_DIR = os.getenv("DXL_RECORD_DIR", "")          # grabación TX/RX (dxl_replay.py); "" = no
+# Status Return Level a dejar en los servos al arrancar: "" = solo leerlo;
+# 1 = escrituras sin status (salen encadenadas); 2 = todas contestan. 0 no:
+# los READ dejarían de responder.
+RETURN_LEVEL = int(os.getenv("DXL_RETURN_LEVEL") or 0) or None
+if RETURN_LEVEL not in (None, 1, 2): raise ValueError("DXL_RETURN_LEVEL must be 1 or 2")
+
+INSPECT_FIELDS = ("PRESENT_POSITION","PRESENT_SPEED","PRESENT_LOAD",
+                  "PRESENT_VOLTAGE","PRESENT_TEMP","TORQUE_ENABLE","RETURN_LEVEL")
+
+# ───────────── Bus + FastAPI ─────────────
+bus = DxlRouter(BUSES, TIMEOUT,                          # <── un hilo/dueño por puerto
+                HealthMonitor(TIMEOUT, min(b for _,b,_ in BUSES)), RECORD_DIR)
+# peor caso garantizado petición → torque off en el cable (bench_urgent.py lo mide)
+URGENT_BOUND = bus.urgent_bound(MAX_READ, bulk=BULK_READ)
+
+@asynccontextmanager
+async def lifespan(_app:FastAPI):
+    await bus.start()
+    try:    await bus.sync_return_levels(parse_ids(POLL_IDS), RETURN_LEVEL)
+    except BusUnavailable: pass         # sin bus: se asume nivel 2 hasta leerlo
+    poller.start(); bus.health.start(bus.ping, read_return_delay)
+    coalescer.start()
+    try:     yield
+    finally:
+        runner.cancel(); await coalescer.stop(); await poller.stop(); await bus.health.stop()
+        await bus.close()
+        if history is not None: history.flush()
 
-ADDR = {
-    "RETURN_LEVEL":     16,
-    "TORQUE_ENABLE":    24,
-    "PRESENT_POSITION": 36,
-    "PRESENT_SPEED":    38,
-    "PRESENT_LOAD":     40,
-    "PRESENT_VOLTAGE":  42,
-    "PRESENT_TEMP":     43,
-}
-
-# ───────────── FastAPI ─────────────
-app = FastAPI(title="Dynamixel Web API")
+app = FastAPI(title="Dynamixel Web API", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_methods=["*"], allow_headers=["*"],
 )
 
-# ───────────── Utilidades DXL ─────────────
-serial_lock = threading.Lock()           # <── evita accesos simultáneos
+@app.middleware("http")
+async def http_metrics(request:Request, call_next):
+    t0 = time.monotonic(); status = 500
+    try:
+        resp = await call_next(request); status = resp.status_code
+        return resp
+    finally:
+        route = request.scope.get("route")              # plantilla: /api/inspect/{sid}
+        HTTP_LATENCY.labels(request.method, getattr(route, "path", "unmatched"),
+                            status).observe(time.monotonic() - t0)
+
+@app.exception_handler(BusUnavailable)
+async def bus_unavailable(_req:Request, exc:BusUnavailable):
+    return JSONResponse({"detail":f"Bus unavailable: {exc}"}, status_code=503)
 
-def checksum(payload: List[int]) -> int: return (~sum(payload)) & 0xFF
+@app.exception_handler(Stopped)
+async def stopped(_req:Request, exc:Stopped):
+    return JSONResponse({"detail":f"Stopped: {exc}"}, status_code=409)
+
+# ───────────── Utilidades DXL ─────────────
 def deg_to_units(angle: float) -> int:   return int(angle * DXL_RES / 300 + 0.5)
+def rpm_to_units(rpm: float) -> int:     return min(1023, int(rpm / 0.111 + 0.5))
+
+async def dxl_send(pkt:bytes, expect:int=0, epoch:Optional[int]=None) -> bytes:
+    """TX/RX sobre el bus compartido (serializado en el hilo de AsyncDxlBus).
+    `epoch`: la de bus.epoch al empezar la operación; tras un stop → Stopped."""
+    return await bus.transact(pkt, expect, epoch=epoch)
+
+async def dxl_read_fields(sid:int, fields:Iterable[str],
+                          required:str="") -> Optional[Dict[str,Optional[int]]]:
+    """Lee varios registros con el mínimo de READ_DATA (ver control_table);
+    los que siguen vigentes en la sombra (EEPROM, TORQUE_ENABLE…) no van al bus.
+    Si el tramo que contiene `required` no responde devuelve None sin
+    gastar más timeouts en ese servo."""
+    out: Dict[str,Optional[int]] = dict(bus.shadow.get_fields(sid, fields))
+    spans = sorted(plan_reads([f for f in fields if f not in out]),
+                   key=lambda sp: required not in sp.fields)
+    for sp in spans:
+        data = await bus.read(sid, sp.addr, sp.length)
+        if data is None and required in sp.fields: return None
+        out.update(decode_span(sp, data) if data is not None
+                   else dict.fromkeys(sp.fields))
+    return out
 
-def pkt_write(sid:int, addr:int, *data:int) -> bytes:
-    p = [sid, 3+len(data), 3, addr, *data]
-    return bytes([0xFF,0xFF,*p, checksum(p)])
-
-def pkt_read(sid:int, addr:int, length:int) -> bytes:
-    p = [sid, 4, 2, addr, length]
-    return bytes([0xFF,0xFF,*p, checksum(p)])
-
-@contextmanager
-def open_bus():
-    ser = serial.Serial(PORT, BAUD, timeout=TIMEOUT, write_timeout=0.2)
-    try:    yield ser
-    finally:ser.close()
-
-def dxl_send(pkt:bytes, expect:int=0) -> bytes:
-    """TX/RX protegido por lock global."""
-    with serial_lock:
-        with open_bus() as ser:
-            ser.dtr = False; ser.reset_input_buffer()
-            ser.write(pkt);  ser.flush()
-            while ser.out_waiting: time.sleep(0)
-            time.sleep(0.00005)     # cambio RX
-            ser.dtr = True
-            return ser.read(expect)
-
-def dxl_read(sid:int, addr:int, length:int) -> Optional[List[int]]:
-    resp = dxl_send(pkt_read(sid, addr, length), expect=6+length)
-    if len(resp) != 6+length or resp[:2] != b"\xFF\xFF": return None
-    if checksum(list(resp[2:-1])) != resp[-1]:            return None
-    return list(resp[5:5+length])
+async def read_return_delay(sid:int) -> Optional[int]:
+    data = await bus.read(sid, ADDR["RETURN_DELAY"], 1)
+    return None if data is None else data[0]
 
 def format_load(raw:int)->str:
     return f'{"-" if raw & 0x400 else "+"}{(raw&0x3FF)*100/1023:.1f}%'
@@ -83,87 +152,411 @@ def format_load(raw:int)->str:
 class MoveCmd(BaseModel):
     id:int; angle:float
 
+class MoveTarget(BaseModel):
+    id:int; angle:float
+    speed:Optional[float]=None      # RPM (0 = máx. del servo, None = no se toca)
+
+class BatchMoveCmd(BaseModel):
+    targets:List[MoveTarget]
+    mode:Literal["sync","action"]="sync"   # SYNC_WRITE  |  REG_WRITE + ACTION
+    torque:bool=True
+
+class Waypoint(BaseModel):
+    angles:List[float]                     # uno por ID, en el orden de `ids`
+    duration:Optional[float]=None          # s (None → lo fija vmax)
+
+class TrajectoryCmd(BaseModel):
+    ids:List[int]=[1,2,3,4]
+    waypoints:List[Waypoint]
+    profile:Literal["minjerk","trapezoid"]="minjerk"
+    vmax:float=60.0                        # °/s por junta
+    rate_hz:float=50.0                     # 50-100 Hz
+    blend_s:float=0.0                      # 0 = preempción directa
+
+class CartesianCmd(BaseModel):
+    x:float; y:float; z:float              # mm, marco de la base
+    gripper:Optional[float]=None           # ° del servo 4 (None = no se toca)
+    elbow_up:bool=True
+    duration:Optional[float]=None          # s → trayectoria min-jerk; None → SYNC_WRITE directo
+    speed:Optional[float]=None             # RPM (solo movimiento directo)
+
+class FkCmd(BaseModel):
+    poses:List[List[float]]                # [[base,hombro,codo(,gripper)], ...] en ° de servo
+
 # ───────────── Endpoints ─────────────
 @app.get("/api/status")
-def api_status(): return {"status":"active","port":PORT,"baud":BAUD,"time":time.time()}
+async def api_status():
+    return {"status":"active","port":PORT,"baud":BAUD,
+            "bus_connected":bus.connected,"bus_opens":bus.opens,"bus_pending":bus.pending,
+            "buses":bus.stats(),"shadow":bus.shadow.stats(),
+            "urgent_bound_ms":round(URGENT_BOUND*1e3, 2),
+            "poller":poller.stats(),
+            "inventory":[b._asdict() for b in INVENTORY],
+            "history":history.stats() if history is not None else None,"time":time.time()}
+
+@app.post("/api/shadow/invalidate")
+async def api_shadow_invalidate(id:Optional[int]=None):
+    """Olvida la copia de la tabla (p. ej. tras cambiar la EEPROM con otra herramienta)."""
+    bus.shadow.invalidate(id)
+    return {"invalidated":"all" if id is None else id}
+
+@app.get("/api/health")
+async def api_health():
+    """RTT, tasas de timeout/checksum y estado del circuit breaker por servo."""
+    return bus.health.stats()
+
+_wire_seen: Dict[str, tuple] = {}          # puerto → (monotonic, s de cable) del último scrape
+
+def bus_utilization() -> Dict[tuple, float]:
+    """% del tiempo de pared con bytes en el cable desde el scrape anterior."""
+    out, now = {}, time.monotonic()
+    for port in bus.buses:
+        wire = DXL_WIRE.labels(port).value
+        t0, w0 = _wire_seen.get(port, (None, 0.0))
+        _wire_seen[port] = (now, wire)
+        if t0 is not None and now > t0: out[(port,)] = round(100*(wire - w0)/(now - t0), 3)
+    return out
+
+REGISTRY.add(Gauge("dxl_bus_utilization_percent",
+    "Wire time over wall time since the previous scrape", ("port",), bus_utilization))
+REGISTRY.add(Gauge("dxl_bus_pending_jobs", "Jobs queued on the bus I/O thread", ("port",),
+    lambda: {(p,):b.pending for p,b in bus.buses.items()}))
+REGISTRY.add(Gauge("dxl_urgent_bound_seconds",
+    "Guaranteed worst case from a stop/torque request to its packet on the wire", (),
+    lambda: {():URGENT_BOUND}))
+REGISTRY.add(Gauge("dxl_breaker_open", "Servos with an open circuit breaker", (),
+    lambda: {():len(bus.health.open_ids())}))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Exposición en texto de Prometheus (latencias del bus y de los endpoints)."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+async def flush_goals(ids:List[int], goals:List[int]):
+    """Metas coalescidas: torque on (la sombra omite las filas que ya lo tienen) + goal."""
+    ep = bus.epoch
+    await dxl_send(pkt_sync_write(TORQUE_EN,[(sid,[1]) for sid in ids]), epoch=ep)
+    await dxl_send(pkt_sync_write(GOAL_POS,[(sid,[g&0xFF,g>>8]) for sid,g in zip(ids,goals)]),
+                   epoch=ep)
+
+coalescer = GoalCoalescer(flush_goals, MOVE_HZ)
 
 @app.post("/api/move")
-def api_move(cmd:MoveCmd):
+async def api_move(cmd:MoveCmd):
+    """Encola la meta (gana la última por servo) y vuelve sin esperar al bus."""
     if not (0<=cmd.angle<=300):      raise HTTPException(400,"Angle 0-300°")
     if not (1<=cmd.id<=253):         raise HTTPException(400,"Servo ID 1-253")
-    pos=deg_to_units(cmd.angle)
-    dxl_send(pkt_write(cmd.id, TORQUE_EN, 0x01))
-    dxl_send(pkt_write(cmd.id, GOAL_POS, pos&0xFF, pos>>8))
-    return {"servo_id":cmd.id,"angle_deg":cmd.angle}
+    if not bus.bus_for(cmd.id).connected:
+        raise BusUnavailable(f"no bus for servo {cmd.id}")
+    runner.cancel()                      # un comando manual manda sobre la trayectoria
+    seq=coalescer.submit(cmd.id, deg_to_units(cmd.angle))
+    return {"servo_id":cmd.id,"angle_deg":cmd.angle,"seq":seq,"done_seq":coalescer.done_seq}
+
+@app.get("/api/move/status")
+async def api_move_status(): return coalescer.stats()
 
 @app.post("/api/stop")
-def api_stop():   dxl_send(pkt_write(0xFE,TORQUE_EN,0x00)); return {"status":"torque_disabled_all"}
+async def api_stop():
+    # nada pedido antes sale después del torque off: ni lo encolado (fence) ni
+    # lo que una operación a medias (move_batch, trayectoria) encole luego
+    runner.cancel(); bus.fence(); await coalescer.halt()
+    await bus.write(BROADCAST,TORQUE_EN,0x00,prio=URGENT); return {"status":"torque_disabled_all"}
 @app.post("/api/resume")
-def api_resume(): dxl_send(pkt_write(0xFE,TORQUE_EN,0x01)); return {"status":"torque_enabled_all"}
+async def api_resume(): await bus.write(BROADCAST,TORQUE_EN,0x01); return {"status":"torque_enabled_all"}
+
+async def move_batch(targets:List[MoveTarget], mode:str="sync", torque:bool=True) -> int:
+    """Mueve varios servos a la vez; devuelve cuántos paquetes se enviaron.
+    sync   → (SYNC_WRITE torque) + SYNC_WRITE goal[/speed]: todos arrancan juntos.
+    action → REG_WRITE por servo + ACTION broadcast (el movimiento sale con ACTION)."""
+    ep=bus.epoch                        # un /api/stop a mitad anula los paquetes que falten
+    ids=[t.id for t in targets]
+    if not targets or len(targets)>SYNC_MAX: raise HTTPException(400,f"1-{SYNC_MAX} targets")
+    if len(set(ids))!=len(ids):              raise HTTPException(400,"Duplicate servo IDs")
+    for t in targets:
+        if not (0<=t.angle<=300):            raise HTTPException(400,"Angle 0-300°")
+        if not (1<=t.id<=253):               raise HTTPException(400,"Servo ID 1-253")
+        if t.speed is not None and not (0<=t.speed<=114):
+                                             raise HTTPException(400,"Speed 0-114 RPM")
+    def le16(v:int): return [v&0xFF, v>>8]
+    goal ={t.id:le16(deg_to_units(t.angle)) for t in targets}
+    speed={t.id:le16(rpm_to_units(t.speed)) for t in targets if t.speed is not None}
+
+    pkts=[]
+    if torque: pkts.append(pkt_sync_write(TORQUE_EN,[(sid,[1]) for sid in ids]))
+    if mode=="action":
+        pkts += [pkt_reg_write(sid,GOAL_POS,*goal[sid],*speed.get(sid,[])) for sid in ids]
+        pkts.append(pkt_action())
+    elif len(speed)==len(ids):          # goal+speed contiguos (30-33) en un paquete
+        pkts.append(pkt_sync_write(GOAL_POS,[(sid,goal[sid]+speed[sid]) for sid in ids]))
+    else:
+        if speed: pkts.append(pkt_sync_write(MOV_SPEED,list(speed.items())))
+        pkts.append(pkt_sync_write(GOAL_POS,list(goal.items())))
+    runner.cancel(); coalescer.drop(ids)
+    for pkt in pkts: await dxl_send(pkt, epoch=ep)
+    return len(pkts)
+
+@app.post("/api/move/batch")
+async def api_move_batch(cmd:BatchMoveCmd):
+    n=await move_batch(cmd.targets, cmd.mode, cmd.torque)
+    return {"targets":[t.dict() for t in cmd.targets],"mode":cmd.mode,"packets":n}
 
 @app.post("/api/reset")
-def api_reset():
+async def api_reset():
     targets={1:80,2:64,3:64,4:120}
-    for sid,ang in targets.items():
-        pos=deg_to_units(ang)
-        dxl_send(pkt_write(sid,TORQUE_EN,0x01))
-        dxl_send(pkt_write(sid,GOAL_POS,pos&0xFF,pos>>8))
+    await move_batch([MoveTarget(id=sid,angle=ang) for sid,ang in targets.items()])
     return {"status":"custom_reset_done","targets_deg":targets}
 
+# ---------- trayectorias ----------
+async def send_setpoint(ids:List[int], goal, speed, epoch:Optional[int]):
+    """Un SYNC_WRITE goal+speed (30-33) por muestra del lazo."""
+    rows=[(sid,(g&0xFF,g>>8,v&0xFF,v>>8)) for sid,g,v in zip(ids,goal.tolist(),speed.tolist())]
+    await dxl_send(pkt_sync_write(GOAL_POS, rows), epoch=epoch)
+
+async def release_speed(ids:List[int], epoch:Optional[int]):
+    """Fin o cancelación de la trayectoria: Moving Speed vuelve a 0 (máxima), si
+    no quedaría en el último valor del perfil (≈ 1) y /api/move se arrastraría.
+    Con la época de la trayectoria: tras /api/stop no sale detrás del torque-off."""
+    try:
+        await dxl_send(pkt_sync_write(MOV_SPEED,[(sid,[0,0]) for sid in ids]), epoch=epoch)
+    except Stopped:
+        pass
+
+runner = TrajectoryRunner(send_setpoint, release_speed)
+
+async def present_angles(ids:List[int]) -> List[float]:
+    """Punto de partida: setpoint en curso o lectura directa. Nunca la foto del
+    poller: con hasta MAX_AGE de antigüedad el primer setpoint daría un salto."""
+    cur = runner.current() if runner.running else None
+    if cur is not None and all(i in cur for i in ids): return [cur[i] for i in ids]
+    out=[]
+    for sid in ids:
+        out.append((await inspect_one(sid, max_age=0))["position_deg"])
+    return out
+
+@app.post("/api/trajectory")
+async def api_trajectory(cmd:TrajectoryCmd):
+    if not cmd.ids or len(set(cmd.ids))!=len(cmd.ids) or len(cmd.ids)>SYNC_MAX:
+        raise HTTPException(400,"ids must be unique, 1-%d" % SYNC_MAX)
+    if not all(1<=i<=253 for i in cmd.ids):   raise HTTPException(400,"Servo ID 1-253")
+    if not cmd.waypoints:                     raise HTTPException(400,"At least one waypoint")
+    for w in cmd.waypoints:
+        if len(w.angles)!=len(cmd.ids):       raise HTTPException(400,"One angle per id")
+        if not all(0<=a<=300 for a in w.angles): raise HTTPException(400,"Angle 0-300°")
+        if w.duration is not None and not (0<w.duration<=MAX_DURATION):
+                                              raise HTTPException(422,f"duration 0-{MAX_DURATION:g} s")
+    if not (10<=cmd.rate_hz<=100):            raise HTTPException(422,"rate_hz 10-100")
+    if not (math.isfinite(cmd.vmax) and cmd.vmax>0): raise HTTPException(422,"vmax finite > 0")
+
+    ep    = bus.epoch
+    start = await present_angles(cmd.ids)
+    try:
+        traj = plan_trajectory(cmd.ids, start, [(w.angles,w.duration) for w in cmd.waypoints],
+                               rate=cmd.rate_hz, vmax=cmd.vmax, profile=cmd.profile)
+    except ValueError as e:                   # p. ej. vmax ínfimo: más de MAX_DURATION
+        raise HTTPException(422,str(e))
+    if not runner.running:
+        await dxl_send(pkt_sync_write(TORQUE_EN,[(sid,[1]) for sid in cmd.ids]), epoch=ep)
+    if bus.epoch != ep: raise Stopped("stop while planning the trajectory")
+    coalescer.drop(cmd.ids)
+    runner.start(traj, cmd.blend_s, epoch=ep)
+    return {"ids":cmd.ids,"samples":len(traj.t),"duration_s":round(traj.duration,3),
+            "start_deg":[round(a,1) for a in start]}
+
+@app.get("/api/trajectory")
+async def api_trajectory_status(): return runner.status()
+
+@app.post("/api/trajectory/stop")
+async def api_trajectory_stop():
+    runner.cancel(); return runner.status()
+
+# ---------- cinemática ----------
+@app.post("/api/fk")
+async def api_fk(cmd:FkCmd):
+    if not cmd.poses or any(len(p) not in (3,4) for p in cmd.poses):
+        raise HTTPException(400,"Each pose needs 3 or 4 angles")
+    frames = kinematics.fk_frames(np.array([p[:3] for p in cmd.poses]))
+    return {"tip_mm":np.round(frames[:,-1],2).tolist(),
+            "frames_mm":np.round(frames,2).tolist()}
+
+@app.get("/api/fk")
+async def api_fk_current():
+    angles=[(await inspect_one(sid))["position_deg"] for sid in ARM_IDS]
+    tip=kinematics.fk(np.array([angles]))[0]
+    return {"angles_deg":angles,"tip_mm":np.round(tip,2).tolist()}
+
+@app.post("/api/move_cartesian")
+async def api_move_cartesian(cmd:CartesianCmd):
+    t0=time.perf_counter()
+    sol=kinematics.ik_one(cmd.x, cmd.y, cmd.z, cmd.elbow_up)
+    ik_us=(time.perf_counter()-t0)*1e6
+    if sol is None: raise HTTPException(422,"Target invalid, out of reach or outside 0-300° limits")
+    if cmd.gripper is not None and not (0<=cmd.gripper<=300):
+        raise HTTPException(400,"Angle 0-300°")
+
+    ids, angles = list(ARM_IDS), [round(a,2) for a in sol]
+    if cmd.gripper is not None: ids.append(GRIPPER_ID); angles.append(cmd.gripper)
+    if cmd.duration is not None:
+        await api_trajectory(TrajectoryCmd(ids=ids, waypoints=[Waypoint(angles=angles, duration=cmd.duration)]))
+    else:
+        await move_batch([MoveTarget(id=i, angle=a, speed=cmd.speed) for i,a in zip(ids,angles)])
+    return {"target_mm":[cmd.x,cmd.y,cmd.z],"ids":ids,"angles_deg":angles,
+            "ik_us":round(ik_us,1),"ik_cache":kinematics.ik_cache_info()._asdict()}
+
 # ---------- helper para un solo servo ----------
-def inspect_one(sid:int):
-    pos  = dxl_read(sid,ADDR["PRESENT_POSITION"],2)
-    if pos is None: raise HTTPException(504,f"No response from {sid}")
-    spd  = dxl_read(sid,ADDR["PRESENT_SPEED"],2)
-    load = dxl_read(sid,ADDR["PRESENT_LOAD"],2)
-    volt = dxl_read(sid,ADDR["PRESENT_VOLTAGE"],1)
-    temp = dxl_read(sid,ADDR["PRESENT_TEMP"],1)
-    tq   = dxl_read(sid,ADDR["TORQUE_ENABLE"],1)
-    ret  = dxl_read(sid,ADDR["RETURN_LEVEL"],1)
-
-    pos_raw = pos[0]|(pos[1]<<8)
+async def read_inspect(sid:int) -> Optional[Dict[str,Optional[int]]]:
+    return await dxl_read_fields(sid, INSPECT_FIELDS, required="PRESENT_POSITION")
+
+async def read_inspect_bulk(ids:List[int]) -> Dict[int,Optional[Dict[str,Optional[int]]]]:
+    """Igual que read_inspect para todos los IDs, con un BULK_READ por tramo
+    en vez de un READ_DATA por servo y tramo. Quien no responde el tramo de
+    PRESENT_POSITION queda en None y no entra en los siguientes."""
+    spans = sorted(plan_reads(INSPECT_FIELDS), key=lambda sp: "PRESENT_POSITION" not in sp.fields)
+    out: Dict[int,Optional[Dict[str,Optional[int]]]] = {sid:{} for sid in ids}
+    for k, sp in enumerate(spans):
+        alive = []
+        for sid in ids:
+            if out[sid] is None: continue
+            cached = bus.shadow.get_fields(sid, sp.fields)
+            if len(cached) == len(sp.fields): out[sid].update(cached)   # tramo vigente en la sombra
+            else:                             alive.append(sid)
+        for i in range(0, len(alive), BULK_MAX):
+            chunk = alive[i:i+BULK_MAX]
+            got = await bus.bulk_read([(sid, sp.addr, sp.length) for sid in chunk])
+            for sid in chunk:
+                data = got.get(sid)
+                if data is None and k == 0: out[sid] = None
+                else: out[sid].update(decode_span(sp, data) if data is not None
+                                      else dict.fromkeys(sp.fields))
+    return out
+
+poller = TelemetryPoller(read_inspect, parse_ids(POLL_IDS), POLL_HZ,
+                         read_many=read_inspect_bulk if BULK_READ else None,
+                         partition=bus.split)
+
+history = HistoryStore(HISTORY_DIR, poller.ids, INSPECT_FIELDS, HISTORY_LEN) \
+          if HISTORY_DIR and poller.ids else None
+if history is not None: poller.listeners.append(history.append)
+
+async def inspect_one(sid:int, max_age:float=MAX_AGE):
+    """Sirve desde la foto del poller si es reciente; si no, lee del bus
+    (salvo que el poller ya barra ese ID: entonces un fallo es un 504)."""
+    hit = poller.get(sid, max_age)
+    if hit is not None:
+        r, age = hit
+    elif poller.covers(sid, max_age):
+        raise HTTPException(504,f"No recent data from {sid}")
+    else:
+        r = await read_inspect(sid)
+        if r is None: raise HTTPException(504,f"No response from {sid}")
+        poller.update(sid, r); age = 0.0
+    return {**format_inspect(sid, r), "age_s":round(age,3), "field_age_s":poller.ages(sid)}
+
+def format_inspect(sid:int, r:Dict[str,Optional[int]]):
+    pos_raw, spd, load = r["PRESENT_POSITION"], r.get("PRESENT_SPEED"), r.get("PRESENT_LOAD")
+    volt, temp = r.get("PRESENT_VOLTAGE"), r.get("PRESENT_TEMP")
+    tq, ret    = r.get("TORQUE_ENABLE"), r.get("RETURN_LEVEL")
     return {
         "servo_id":sid,
         "position_deg": round(pos_raw*300/1023,1),
         "position_raw": pos_raw,
-        "speed_rpm":    round(((spd[0]|(spd[1]<<8))*0.111),1) if spd else None,
-        "load":         format_load(load[0]|(load[1]<<8))      if load else None,
-        "voltage_v":    volt[0]/10    if volt else None,
-        "temperature_c":temp[0]       if temp else None,
-        "torque_enabled":bool(tq[0])  if tq else None,
-        "status_return_level":ret[0]  if ret else None,
+        "speed_rpm":    round(spd*0.111,1)  if spd  is not None else None,
+        "load":         format_load(load)   if load is not None else None,
+        "voltage_v":    volt/10             if volt is not None else None,
+        "temperature_c":temp,
+        "torque_enabled":bool(tq)           if tq   is not None else None,
+        "status_return_level":ret,
     }
 
+# ---------- historial ----------
+@app.get("/api/history")
+async def api_history(id:int, fields:str="PRESENT_TEMP,PRESENT_LOAD,PRESENT_VOLTAGE",
+                      start:Optional[float]=None, end:Optional[float]=None, points:int=300):
+    """Serie [start, end] (epoch s; por defecto la última hora) reducida a
+    `points` cubetas con min/max/mean en unidades físicas."""
+    if history is None:                      raise HTTPException(404,"History disabled")
+    if id not in poller.ids:                 raise HTTPException(404,f"Servo {id} not in history")
+    names = [f for f in fields.split(",") if f]
+    bad   = [f for f in names if f not in INSPECT_FIELDS]
+    if bad or not names:                     raise HTTPException(400,f"fields must be in {list(INSPECT_FIELDS)}")
+    if not (1<=points<=2000):                raise HTTPException(400,"points 1-2000")
+    end   = time.time() if end is None else end
+    start = end - 3600 if start is None else start
+    if start >= end:                         raise HTTPException(400,"start < end")
+    # horas de muestras: fuera del event loop para no frenar el streaming
+    return await asyncio.to_thread(history.query, id, names, start, end, points)
+
 # ---------- endpoint por ID (se mantiene) ----------
 @app.get("/api/inspect/{sid}")
-def api_inspect(sid:int): return inspect_one(sid)
+async def api_inspect(sid:int, max_age:float=MAX_AGE): return await inspect_one(sid, max_age)
 
 # ---------- endpoint “elegante” lista completa ----------
 @app.get("/api/inspect")
-def api_inspect_all(ids:str="1,2,3,4"):
+async def api_inspect_all(ids:str="1,2,3,4", max_age:float=MAX_AGE):
     try:
         id_list=[i for i in map(int,ids.split(",")) if 1<=i<=253]
     except ValueError:
         raise HTTPException(400,"ids must be CSV of integers")
 
+    # en paralelo: cada bus atiende a sus servos a la vez
+    got=await asyncio.gather(*(inspect_one(sid, max_age) for sid in id_list),
+                             return_exceptions=True)
     result=[]
-    for sid in id_list:
-        try:
-            result.append(inspect_one(sid))
-        except HTTPException:
-            continue                    # omite servos que no respondan
+    for r in got:
+        if isinstance(r, HTTPException): continue   # omite servos que no respondan
+        if isinstance(r, BaseException): raise r
+        result.append(r)
     if not result:
         raise HTTPException(504,"No servos responded")
     return result
 
+# ---------- streaming: WebSocket (preferido) y SSE (fallback) ----------
+@app.websocket("/ws/telemetry")
+async def ws_telemetry(ws:WebSocket, ids:str=POLL_IDS, fields:str="", rate:float=MAX_RATE):
+    """Frames delta; el cliente puede re-suscribirse enviando
+    {"ids":[...], "fields":[...], "rate":Hz} en cualquier momento."""
+    try:    sub = parse_sub(ids, fields, rate)
+    except ValueError: await ws.close(code=1003); return
+    await ws.accept()
+    stream = TelemetryStream(poller, format_inspect, sub)
+
+    async def control():
+        while True:
+            try:    msg = await ws.receive_json()
+            except ValueError: continue             # JSON inválido: se ignora
+            if not isinstance(msg, dict): continue
+            try:
+                sub.update(msg.get("ids", sub.ids), msg.get("fields", sub.fields),
+                           float(msg.get("rate", sub.rate)))
+            except (TypeError, ValueError): continue  # {"rate":"x"}, {"ids":["a"]}…: se ignora
+    ctl = asyncio.create_task(control())
+    try:
+        async for frame in stream.frames(lambda: not ctl.done()):
+            await ws.send_json(frame)
+    except (WebSocketDisconnect, RuntimeError):
+        pass                                        # cliente cerrado a mitad de envío
+    finally:
+        ctl.cancel()
+
+@app.get("/api/telemetry/stream")
+async def api_telemetry_stream(request:Request, ids:str=POLL_IDS, fields:str="", rate:float=10):
+    try:    stream = TelemetryStream(poller, format_inspect, parse_sub(ids, fields, rate))
+    except ValueError: raise HTTPException(400,"ids must be CSV of integers, rate finite")
+
+    async def events():
+        async for frame in stream.frames():
+            if await request.is_disconnected(): break
+            yield sse_event(frame)
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control":"no-cache"})
+
 class TorqueCmd(BaseModel):
     id: int
     enable: bool
 
 @app.post("/api/torque")
-def api_torque(cmd: TorqueCmd):
+async def api_torque(cmd: TorqueCmd):
     if not (1 <= cmd.id <= 253):
         raise HTTPException(400, "Servo ID 1-253")
 
-    dxl_send(pkt_write(cmd.id, TORQUE_EN, 0x01 if cmd.enable else 0x00))
+    await bus.write(cmd.id, TORQUE_EN, 0x01 if cmd.enable else 0x00, force=True, prio=URGENT)
     return {"servo_id": cmd.id, "torque": cmd.enable}
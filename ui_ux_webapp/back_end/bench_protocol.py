@@ -0,0 +1,98 @@
+"""
+bench_protocol.py — Micro-benchmark de codificación/decodificación (dxl_protocol)
+Compara los constructores de antes (listas de ints + re-suma en cada
+llamada, como en los scripts de ft232rl) con los de ahora: READ/PING
+memorizados, WRITE en buffer preasignado y status decodificado con
+struct.Struct a un registro con __slots__, memorizado por bytes. El decode
+se mide repetido (servo quieto: acierto de caché) y con respuestas siempre
+distintas (fallo: Struct + objeto, algo más lento que la lista de antes).
+Por operación mide el tiempo (timeit) y la memoria transitoria que reserva
+(pico de tracemalloc):
+
+    python bench_protocol.py
+    python bench_protocol.py -n 500000
+────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse, itertools, timeit, tracemalloc
+from typing import Callable, List, Optional, Tuple
+
+from dxl_protocol import PacketBuffer, decode_status, pkt_read, pkt_write
+
+SID, ADDR, LEN = 3, 36, 8
+DATA = (0x00, 0x02)
+STATUS = bytes([0xFF, 0xFF, SID, LEN+2, 0x00, 1, 2, 3, 4, 5, 6, 7, 8])
+STATUS = STATUS + bytes([(~sum(STATUS[2:])) & 0xFF])
+
+def _status(k:int) -> bytes:
+    """Status de LEN parámetros distinto para cada k (más que la caché)."""
+    p = bytes([SID, LEN+2, 0x00, *k.to_bytes(LEN, "little")])
+    return b"\xFF\xFF" + p + bytes([(~sum(p)) & 0xFF])
+VARIED = [_status(k) for k in range(1, 8192)]
+
+
+# ---------- como estaba (listas + sum en cada llamada) ----------
+def legacy_checksum(packet:List[int]) -> int: return (~sum(packet[2:])) & 0xFF
+
+def legacy_read(sid:int, addr:int, length:int) -> bytes:
+    p = [0xFF, 0xFF, sid, 0x04, 0x02, addr & 0xFF, length & 0xFF]
+    p.append(legacy_checksum(p))
+    return bytes(p)
+
+def legacy_write(sid:int, addr:int, *data:int) -> bytes:
+    p = [0xFF, 0xFF, sid, 3+len(data), 0x03, addr, *data]
+    p.append(legacy_checksum(p))
+    return bytes(p)
+
+def legacy_decode(resp:bytes, length:int) -> Optional[List[int]]:
+    if (len(resp) == 6 + length and resp[:2] == b"\xFF\xFF"
+            and (~sum(resp[2:-1])) & 0xFF == resp[-1]):
+        return list(resp[5:5+length])
+    return None
+
+
+# ---------- medición ----------
+def per_op_us(fn:Callable[[], object], n:int) -> float:
+    return min(timeit.repeat(fn, number=n, repeat=5)) / n * 1e6
+
+def transient_bytes(fn:Callable[[], object]) -> int:
+    """Pico de memoria reservada durante una llamada (lo que se crea y se tira)."""
+    fn()                                        # calienta cachés
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - base
+
+def main():
+    ap = argparse.ArgumentParser(description="Micro-benchmark de dxl_protocol")
+    ap.add_argument("-n", type=int, default=200_000, help="iteraciones por medición")
+    n = ap.parse_args().n
+
+    buf = PacketBuffer()
+    assert legacy_read(SID, ADDR, LEN) == pkt_read(SID, ADDR, LEN)
+    assert legacy_write(SID, 30, *DATA) == pkt_write(SID, 30, *DATA) == bytes(buf.write(SID, 30, DATA))
+    assert legacy_decode(STATUS, LEN) == list(decode_status(STATUS).params)
+
+    # (nombre, antes, ahora, suma a la transacción): el total usa el peor caso
+    cases: List[Tuple[str, Callable[[], object], Callable[[], object], bool]] = [
+        ("READ encode",   lambda: legacy_read(SID, ADDR, LEN), lambda: pkt_read(SID, ADDR, LEN), True),
+        ("WRITE encode",  lambda: legacy_write(SID, 30, *DATA), lambda: buf.write(SID, 30, DATA), True),
+        ("status decode", lambda: legacy_decode(STATUS, LEN), lambda: decode_status(STATUS), False),
+        ("  sin caché",   lambda o=itertools.cycle(VARIED): legacy_decode(next(o), LEN),
+                          lambda o=itertools.cycle(VARIED): decode_status(next(o)), True),
+    ]
+    print(f"{'':14} {'antes µs':>9} {'ahora µs':>9} {'×':>5}   {'antes B':>7} {'ahora B':>7}")
+    tot_old = tot_new = 0.0
+    for name, old, new, total in cases:
+        t_old, t_new = per_op_us(old, n), per_op_us(new, n)
+        if total: tot_old += t_old; tot_new += t_new
+        print(f"{name:14} {t_old:9.3f} {t_new:9.3f} {t_old/t_new:5.1f}   "
+              f"{transient_bytes(old):7d} {transient_bytes(new):7d}")
+    print(f"{'transacción':14} {tot_old:9.3f} {tot_new:9.3f} {tot_old/tot_new:5.1f}"
+          "   (READ + WRITE + decode sin caché)")
+
+if __name__ == "__main__":
+    main()
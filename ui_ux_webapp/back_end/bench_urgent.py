@@ -0,0 +1,102 @@
+"""
+bench_urgent.py — Latencia de un torque off con el bus saturado de lecturas
+Mantiene la cola del bus llena de READ_DATA a IDs que no existen (cada uno
+agota el timeout: el peor caso de un barrido de inspect) y, a intervalos
+al azar, manda un torque off broadcast. Mide desde la llamada hasta que el
+paquete terminó de salir y lo compara con DxlRouter.urgent_bound(); sale
+con código 1 si algún envío urgente lo supera. Con --fifo los torque off
+van por la cola normal (como antes) para comparar.
+
+Después repite --race veces un stop con escrituras NORMAL ya encoladas
+(torque on + goal a --ids, como /api/reset): fence() + torque off y,
+vaciada la cola, lee TORQUE_ENABLE. Si algún servo quedó con torque, una
+escritura de antes del stop salió después: también código 1.
+
+    python dxl_emulator.py --ids 1,2,3,4 --link /tmp/dxl0 &
+    python bench_urgent.py --port /tmp/dxl0
+    python bench_urgent.py --port /tmp/dxl0 --fifo
+────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse, asyncio, random, time
+import numpy as np
+
+from bus_router import DxlRouter
+from control_table import MAX_READ
+from dxl_bus import NORMAL, URGENT, Stopped
+from dxl_protocol import BROADCAST, pkt_sync_write
+from servo_health import HealthMonitor
+
+TORQUE_EN = 24
+GOAL_POS  = 30
+
+
+async def sweep(bus:DxlRouter, ids, stop:asyncio.Event):
+    """Barridos concurrentes sin fin: siempre hay len(ids) lecturas encoladas."""
+    while not stop.is_set():
+        await asyncio.gather(*(bus.read(sid, 36, 8) for sid in ids))
+
+async def stop_race(bus:DxlRouter, ids, prio:int) -> bool:
+    """Torque on + goal encolados detrás de las lecturas y un stop enseguida.
+    True si tras vaciar la cola algún servo de `ids` tiene torque."""
+    ep = bus.epoch                              # como move_batch: época al empezar
+    move = asyncio.ensure_future(asyncio.gather(
+        bus.transact(pkt_sync_write(TORQUE_EN, [(i, [1]) for i in ids]), epoch=ep),
+        bus.transact(pkt_sync_write(GOAL_POS, [(i, [0, 2]) for i in ids]), epoch=ep)))
+    await asyncio.sleep(0)                      # ya en la cola del bus
+    bus.fence()
+    await bus.write(BROADCAST, TORQUE_EN, 0, prio=prio)
+    try:    await move
+    except Stopped: pass
+    tq = await asyncio.gather(*(bus.read(i, TORQUE_EN, 1) for i in ids))
+    return any(t is not None and t[0] for t in tq)
+
+async def run(a) -> int:
+    # sin circuit breaker: cada ID ausente cuesta el timeout entero siempre
+    health = HealthMonitor(a.timeout, a.baud, trip_after=1 << 30)
+    bus = DxlRouter([(a.port, a.baud, [])], a.timeout, health)
+    bound = bus.urgent_bound(MAX_READ)
+    if not await bus.start(): raise SystemExit(f"no se pudo abrir {a.port}")
+    prio = NORMAL if a.fifo else URGENT
+    stop, lat, leaked = asyncio.Event(), [], 0
+    servos = [int(i) for i in a.ids.split(",") if i]
+    ids = list(range(200, 200 + a.depth))
+    sweeper = asyncio.ensure_future(sweep(bus, ids, stop))
+    try:
+        await asyncio.sleep(0.1)
+        for _ in range(a.n):
+            await asyncio.sleep(random.uniform(0.005, 0.05))
+            t0 = time.monotonic()
+            await bus.write(BROADCAST, TORQUE_EN, 0, prio=prio)
+            lat.append(time.monotonic() - t0)
+        for _ in range(a.race if servos else 0):
+            leaked += await stop_race(bus, servos, prio)
+    finally:
+        stop.set(); await sweeper; await bus.close()
+
+    x = np.asarray(lat) * 1e3
+    p50, p99 = np.percentile(x, (50, 99))
+    print(f"{'FIFO' if a.fifo else 'URGENT'}: {len(x)} torque off con {a.depth} lecturas "
+          f"de {a.timeout*1e3:.0f} ms en cola")
+    print(f"  p50 {p50:.2f} ms   p99 {p99:.2f} ms   máx {x.max():.2f} ms   "
+          f"cota garantizada {bound*1e3:.2f} ms")
+    over = int((x > bound*1e3).sum())
+    if over: print(f"  {over} envíos por encima de la cota")
+    if servos and a.race:
+        print(f"  stop con torque on + goal encolados: {leaked}/{a.race} dejaron torque en {servos}")
+    return 1 if (over and not a.fifo) or leaked else 0
+
+def main():
+    ap = argparse.ArgumentParser(description="Latencia de torque off con el bus ocupado")
+    ap.add_argument("--port", required=True)
+    ap.add_argument("--baud", type=int, default=1_000_000)
+    ap.add_argument("--timeout", type=float, default=0.02)
+    ap.add_argument("--depth", type=int, default=20, help="lecturas encoladas a la vez")
+    ap.add_argument("-n", type=int, default=100, help="torque off a medir")
+    ap.add_argument("--fifo", action="store_true", help="torque off por la cola normal")
+    ap.add_argument("--ids", default="1,2,3,4", help="servos presentes para la prueba de stop")
+    ap.add_argument("--race", type=int, default=20, help="stops con escrituras encoladas")
+    raise SystemExit(asyncio.run(run(ap.parse_args())))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+bus_recorder.py — Grabación binaria del tráfico serie y su lectura por mmap
+Cada transacción deja una trama TX y (si se esperaba respuesta) una RX en
+un archivo por puerto: timestamp monotónico, dirección, resultado y los
+bytes crudos. DxlBus solo agrega al buffer en memoria (sin E/S de disco);
+un hilo lo vuelca cada `flush_s`, así el camino de control no espera al
+disco. Si el disco no da abasto se descartan tramas (se cuentan) en vez
+de crecer sin tope. RecordingReader recorre el archivo sobre mmap sin
+copiarlo; dxl_replay.py lo usa para reenviar y medir.
+────────────────────────────────────────────────────────────────────────
+"""
+
+import logging, mmap, os, re, struct, threading, time
+from typing import Dict, Iterator, NamedTuple, Optional, Union
+
+log = logging.getLogger("dxl.recorder")
+
+MAGIC  = b"DXLREC1\n"
+HEADER = struct.Struct("<8sddI64s")     # magic, time.time() y monotonic al abrir, baudios, puerto
+FRAME  = struct.Struct("<IdBBH")        # seq, t monotónico (s), dirección, resultado, largo
+
+TX, RX = 0, 1
+OK, TIMEOUT, PARTIAL, IO_ERROR = range(4)
+OUTCOMES = ("ok", "timeout", "partial", "io_error")
+
+Bytes = Union[bytes, bytearray, memoryview]
+
+
+def recording_path(directory:str, port:str) -> str:
+    """/dev/ttyUSB0 → <dir>/ttyUSB0-20250708-153000.dxlrec (uno por sesión)."""
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", os.path.basename(port)) or "bus"
+    return os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.dxlrec")
+
+
+class BusRecorder:
+    def __init__(self, path:str, port:str, baud:int, flush_s:float=0.2,
+                 max_buffer:int=8 << 20):
+        self.path, self.flush_s, self.max_buffer = path, flush_s, max_buffer
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._f = open(path, "wb")
+        self._f.write(HEADER.pack(MAGIC, time.time(), time.monotonic(), baud,
+                                  port.encode()[:64]))
+        self._buf  = bytearray()
+        self._lock = threading.Lock()           # solo protege el buffer (nunca E/S)
+        self._stop = threading.Event()
+        self.seq = self.frames = self.dropped = 0
+        self.bytes_written = HEADER.size
+        self._thread = threading.Thread(target=self._run, name="dxl-recorder", daemon=True)
+        self._thread.start()
+        log.info("grabando %s en %s", port, path)
+
+    # ---------- desde el hilo de E/S del bus ----------
+    def record(self, t_tx:float, tx:Bytes, t_rx:float, rx:Optional[Bytes], outcome:int):
+        """Una transacción: TX y, si se esperaba respuesta, lo recibido (aunque
+        venga vacío: timeout). Un error de E/S sin RX queda en la trama TX."""
+        with self._lock:
+            if len(self._buf) > self.max_buffer:
+                self.dropped += 1; return
+            self.seq += 1
+            b = self._buf
+            b += FRAME.pack(self.seq, t_tx, TX, OK if rx is not None else outcome, len(tx)); b += tx
+            if rx is not None:
+                b += FRAME.pack(self.seq, t_rx, RX, outcome, len(rx)); b += rx
+                self.frames += 1
+            self.frames += 1
+
+    # ---------- hilo de volcado ----------
+    def _run(self):
+        while not self._stop.wait(self.flush_s): self._drain()
+        self._drain()
+
+    def _drain(self):
+        with self._lock:
+            if not self._buf: return
+            data, self._buf = self._buf, bytearray()
+        try:
+            self._f.write(data); self._f.flush()
+            self.bytes_written += len(data)
+        except OSError as e:
+            log.warning("no se pudo escribir %s: %s", self.path, e)
+
+    def close(self):
+        if self._f.closed: return
+        self._stop.set(); self._thread.join()
+        self._f.close()
+
+    def stats(self) -> Dict[str, object]:
+        return {"path":self.path, "transactions":self.seq, "frames":self.frames,
+                "dropped":self.dropped, "bytes":self.bytes_written, "buffered":len(self._buf)}
+
+
+# ───────────── Lectura ─────────────
+class Frame(NamedTuple):
+    seq:int
+    t:float
+    direction:int               # TX | RX
+    outcome:int
+    data:memoryview             # vista sobre el mmap (válida hasta close())
+
+class Transaction(NamedTuple):
+    seq:int
+    t_tx:float
+    tx:memoryview
+    t_rx:Optional[float]        # None: solo envío (sin respuesta esperada)
+    rx:Optional[memoryview]
+    outcome:int
+
+    @property
+    def latency(self) -> Optional[float]:
+        return None if self.t_rx is None else self.t_rx - self.t_tx
+
+
+class RecordingReader:
+    """Lee una grabación sobre mmap; la última trama, si quedó cortada, se ignora."""
+
+    def __init__(self, path:str):
+        self.path = path
+        self._f  = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mv = memoryview(self._mm)
+        if len(self._mm) < HEADER.size: raise ValueError(f"{path}: not a bus recording")
+        magic, self.wall0, self.mono0, self.baud, port = HEADER.unpack_from(self._mm)
+        if magic != MAGIC: raise ValueError(f"{path}: not a bus recording")
+        self.port = port.rstrip(b"\0").decode(errors="replace")
+
+    def __enter__(self) -> "RecordingReader": return self
+    def __exit__(self, *exc): self.close()
+
+    def close(self):
+        try:
+            self._mv.release(); self._mm.close()
+        except BufferError:                     # quedan vistas vivas: lo cierra el GC
+            pass
+        self._f.close()
+
+    def wall_time(self, t:float) -> float:
+        """Timestamp monotónico de la grabación → time.time()."""
+        return self.wall0 + (t - self.mono0)
+
+    def frames(self) -> Iterator[Frame]:
+        mv, off, end = self._mv, HEADER.size, len(self._mv)
+        unpack, size = FRAME.unpack_from, FRAME.size
+        while off + size <= end:
+            seq, t, d, oc, n = unpack(mv, off)
+            off += size
+            if off + n > end: break
+            yield Frame(seq, t, d, oc, mv[off:off+n])
+            off += n
+
+    def transactions(self) -> Iterator[Transaction]:
+        """Tramas TX con su RX (mismo seq, siempre consecutivas)."""
+        pend: Optional[Frame] = None
+        for fr in self.frames():
+            if fr.direction == RX and pend is not None and fr.seq == pend.seq:
+                yield Transaction(pend.seq, pend.t, pend.data, fr.t, fr.data, fr.outcome)
+                pend = None; continue
+            if pend is not None:
+                yield Transaction(pend.seq, pend.t, pend.data, None, None, pend.outcome)
+            pend = fr if fr.direction == TX else None
+        if pend is not None:
+            yield Transaction(pend.seq, pend.t, pend.data, None, None, pend.outcome)
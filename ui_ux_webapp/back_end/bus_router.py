@@ -0,0 +1,238 @@
+"""
+bus_router.py — Varios buses Dynamixel (un FTDI cada uno) tras una sola API
+Cada puerto tiene su AsyncDxlBus con su propio hilo de E/S, así que las
+transacciones de servos en buses distintos corren en paralelo. DxlRouter
+ofrece la misma interfaz que AsyncDxlBus: enruta por ID, reparte los
+SYNC_WRITE / BULK_READ entre buses y manda los broadcast a todos a la vez.
+Todo lo que pasa por aquí alimenta la sombra de la tabla de control
+(shadow.py), que además descarta las escrituras que no cambiarían nada.
+────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio, logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bus_recorder import BusRecorder, recording_path
+from control_table import ADDR
+from dxl_bus import AsyncDxlBus, DxlBus, BULK_CHUNK, NORMAL
+from dxl_protocol import BROADCAST
+from servo_health import HealthMonitor
+from shadow import ControlTableShadow
+
+log = logging.getLogger("dxl.router")
+
+BusSpec = Tuple[str, int, List[int]]        # (puerto, baudios, IDs)
+
+TX_SLACK = 0.002    # flush + vaciado del FIFO del FTDI + giro a RX + despertar hilos
+RETURN_LEVEL = ADDR["RETURN_LEVEL"]
+
+
+def parse_buses(spec:str, default_baud:int) -> List[BusSpec]:
+    """"/dev/ttyUSB0=1,2,3;/dev/ttyUSB1@57600=4" → [(puerto, baudios, ids), ...]"""
+    out: List[BusSpec] = []
+    for part in filter(None, (p.strip() for p in spec.split(";"))):
+        port, _, ids = part.partition("=")
+        port, _, baud = port.partition("@")
+        out.append((port, int(baud) if baud else default_baud,
+                    [int(i) for i in ids.split(",") if i.strip()]))
+    return out
+
+
+class DxlRouter:
+    """IDs → bus. Los IDs sin asignar van al primer bus (el de siempre)."""
+
+    def __init__(self, specs:Sequence[BusSpec], timeout:float, health:HealthMonitor,
+                 record_dir:str=""):
+        if not specs: raise ValueError("at least one bus")
+        self.health = health
+        self.record_dir = record_dir            # "" = sin grabación del tráfico
+        self.shadow = ControlTableShadow()
+        self.buses: Dict[str, AsyncDxlBus] = {}
+        self.routes: Dict[int, AsyncDxlBus] = {}
+        self.specs = list(specs)
+        for port, baud, ids in specs:
+            if port in self.buses:
+                log.warning("%s repetido: se ignora la entrada @%d", port, baud); continue
+            b = self.buses[port] = AsyncDxlBus(DxlBus(port, baud, timeout=timeout, health=health))
+            for sid in ids: self.routes.setdefault(sid, b)
+        self.default = next(iter(self.buses.values()))
+        self._epoch = 0
+
+    def bus_for(self, sid:int) -> AsyncDxlBus:
+        return self.routes.get(sid, self.default)
+
+    def split(self, ids:Iterable[int]) -> List[List[int]]:
+        """IDs agrupados por bus (conserva el orden dentro de cada grupo)."""
+        groups: Dict[int, List[int]] = {}
+        for sid in ids: groups.setdefault(id(self.bus_for(sid)), []).append(sid)
+        return list(groups.values())
+
+    # ---------- misma cara que AsyncDxlBus ----------
+    @property
+    def connected(self) -> bool: return all(b.connected for b in self.buses.values())
+    @property
+    def opens(self) -> int:      return sum(b.opens for b in self.buses.values())
+    @property
+    def pending(self) -> int:    return sum(b.pending for b in self.buses.values())
+
+    async def start(self) -> bool:
+        if self.record_dir:                     # un archivo por puerto y por arranque
+            for port, b in self.buses.items():
+                if b.bus.recorder is None:
+                    b.bus.recorder = BusRecorder(recording_path(self.record_dir, port),
+                                                 port, b.bus.baud)
+        return all(await asyncio.gather(*(b.start() for b in self.buses.values())))
+
+    async def close(self):
+        await asyncio.gather(*(b.close() for b in self.buses.values()))
+        for b in self.buses.values():
+            if b.bus.recorder is not None: b.bus.recorder.close(); b.bus.recorder = None
+
+    async def read(self, sid:int, addr:int, length:int) -> Optional[bytes]:
+        data = await self.bus_for(sid).read(sid, addr, length)
+        if data is not None: self._store(sid, addr, data)
+        return data
+
+    @property
+    def epoch(self) -> int:
+        """Época de stop vigente: quien arma una operación de varios paquetes
+        la toma al empezar y la pasa en cada envío (ver fence)."""
+        return self._epoch
+
+    def fence(self):
+        """Stop: las escrituras de épocas anteriores, encoladas o por encolar,
+        fallan con Stopped en todos los buses (el torque off va después)."""
+        self._epoch += 1
+        for b in self.buses.values(): b.fence()
+
+    async def write(self, sid:int, addr:int, *data:int, force:bool=False,
+                    prio:int=NORMAL, epoch:Optional[int]=None) -> bool:
+        """WRITE_DATA; False si se omitió porque el servo ya tiene ese valor.
+        `force` (comandos de seguridad) y los broadcast se mandan siempre;
+        prio=URGENT pasa delante de lo que haya encolado en el bus."""
+        sh = self.shadow
+        if sid != BROADCAST and not force and sh.matches(sid, addr, data):
+            sh.suppressed += 1
+            return False
+        try:
+            if sid == BROADCAST:
+                await asyncio.gather(*(b.write(sid, addr, *data, prio=prio, epoch=epoch)
+                                       for b in self.buses.values()))
+            else:
+                await self.bus_for(sid).write(sid, addr, *data, prio=prio, epoch=epoch)
+        except BaseException:
+            sh.invalidate(None if sid == BROADCAST else sid, addr, len(data)); raise
+        for i in (self._known() if sid == BROADCAST else [sid]): self._store(i, addr, data)
+        sh.writes += 1
+        return True
+
+    async def ping(self, sid:int) -> bool:
+        return await self.bus_for(sid).ping(sid)
+
+    async def transact(self, pkt:bytes, expect:int=0, prio:int=NORMAL,
+                       epoch:Optional[int]=None) -> bytes:
+        """Unicast → su bus. SYNC_WRITE → un SYNC_WRITE por bus con sus filas
+        (sin las que la sombra ya sabe). Cualquier otro broadcast (ACTION,
+        WRITE…) → todos los buses a la vez."""
+        sid, ins, sh = pkt[2], pkt[4], self.shadow
+        if ins == 0x83: return await self._sync_write(pkt, prio, epoch)
+        if ins == 0x04: sh.invalidate(sid, pkt[5], len(pkt) - 7)          # REG_WRITE: pendiente
+        if ins == 0x06: sh.invalidate(None if sid == BROADCAST else sid)  # RESET
+        targets = self._known() if sid == BROADCAST else [sid]
+        try:
+            if sid != BROADCAST or len(self.buses) == 1:
+                resp = await self.bus_for(sid).transact(pkt, expect, prio, epoch)
+            else:
+                await asyncio.gather(*(b.transact(pkt, 0, prio, epoch)
+                                       for b in self.buses.values()))
+                resp = b""
+        except BaseException:
+            if ins == 0x03:
+                for i in targets: sh.invalidate(i, pkt[5], len(pkt) - 7)
+            raise
+        if ins == 0x03:                                                   # WRITE_DATA crudo
+            for i in targets: self._store(i, pkt[5], pkt[6:-1])
+        return resp
+
+    async def _sync_write(self, pkt:bytes, prio:int, epoch:Optional[int]) -> bytes:
+        addr, n, sh = pkt[5], pkt[6], self.shadow
+        by_bus: Dict[int, Tuple[AsyncDxlBus, List[Tuple[int, bytes]]]] = {}
+        for i in range(7, len(pkt)-1, n+1):
+            sid, data = pkt[i], pkt[i+1:i+1+n]
+            if sh.matches(sid, addr, data): sh.suppressed += 1; continue
+            b = self.bus_for(sid)
+            by_bus.setdefault(id(b), (b, []))[1].append((sid, data))
+        try:
+            await asyncio.gather(*(b.sync_write(addr, r, prio, epoch)
+                                   for b, r in by_bus.values()))
+        except BaseException:
+            for _, rows in by_bus.values():
+                for sid, _ in rows: sh.invalidate(sid, addr, n)
+            raise
+        for _, rows in by_bus.values():
+            for sid, data in rows: self._store(sid, addr, data)
+        sh.writes += len(by_bus)
+        return b""
+
+    async def bulk_read(self, items:Sequence[Tuple[int,int,int]]) -> Dict[int, Optional[bytes]]:
+        by_sid = {it[0]:it for it in items}
+        parts  = await asyncio.gather(*(self.bus_for(g[0]).bulk_read([by_sid[s] for s in g])
+                                        for g in self.split(by_sid)))
+        out: Dict[int, Optional[bytes]] = {}
+        for p in parts: out.update(p)
+        for sid, data in out.items():
+            if data is not None: self._store(sid, by_sid[sid][1], data)
+        return out
+
+    def _known(self) -> List[int]:
+        """IDs a los que llega un broadcast: los de la sombra y los ruteados."""
+        return sorted(set(self.shadow.ids()) | set(self.routes))
+
+    def _store(self, sid:int, addr:int, data:Sequence[int]):
+        """Sombra + Status Return Level del bus si el tramo lo cubre."""
+        self.shadow.store(sid, addr, data)
+        if addr <= RETURN_LEVEL < addr + len(data):
+            self.bus_for(sid).bus.return_level[sid] = data[RETURN_LEVEL - addr]
+
+    async def sync_return_levels(self, ids:Iterable[int],
+                                 want:Optional[int]=None) -> Dict[int, Optional[int]]:
+        """Lee el Status Return Level de `ids` (y lo lleva a `want` donde
+        difiera: es EEPROM, no se reescribe si ya está). Desde ahí cada bus
+        sabe qué escrituras contestan: las que no, salen encadenadas sin
+        esperar el giro de la línea; las que sí, consumen su status."""
+        async def one(sid:int) -> Optional[int]:
+            data = await self.read(sid, RETURN_LEVEL, 1)
+            if data is None: return None
+            if want is not None and data[0] != want:
+                await self.write(sid, RETURN_LEVEL, want, force=True)
+                return want
+            return data[0]
+        ids = list(ids)
+        return dict(zip(ids, await asyncio.gather(*(one(s) for s in ids))))
+
+    def urgent_bound(self, read_max:int, bulk:bool=False) -> float:
+        """Peor caso (s) entre que llega un trabajo URGENT y que su paquete
+        (≤ 8 B) termina de salir: la transacción más larga que puede estar
+        en curso (READ de `read_max` bytes o PING con el timeout base, un
+        BULK_READ de BULK_CHUNK tramos, un SYNC_WRITE de 255 B) + el envío.
+        Los buses van en paralelo, manda el más lento."""
+        worst = 0.0
+        for b in self.buses.values():
+            d, byte = b.bus, 10 / b.bus.baud
+            job = max(d.timeout + (8 + 6+read_max)*byte,              # READ / PING
+                      259*byte)                                       # escritura más larga
+            if bulk:
+                job = max(job, d.bulk_timeout([(0, 0, read_max)]*BULK_CHUNK)
+                               + (7 + 3*BULK_CHUNK)*byte)
+            worst = max(worst, job + 8*byte + TX_SLACK)
+        return worst
+
+    def stats(self) -> List[Dict[str, object]]:
+        routed: Dict[str, List[int]] = {p:[] for p in self.buses}
+        port_of = {id(b):p for p,b in self.buses.items()}
+        for sid, b in sorted(self.routes.items()): routed[port_of[id(b)]].append(sid)
+        return [{"port":p, "baud":b.bus.baud, "ids":routed[p], "connected":b.connected,
+                 "opens":b.opens, "pending":b.pending, "fenced":b.fenced, "echo":b.bus.echo,
+                 "return_level":dict(sorted(b.bus.return_level.items())),
+                 "recorder":b.bus.recorder.stats() if b.bus.recorder else None}
+                for p,b in self.buses.items()]
@@ -0,0 +1,102 @@
+"""
+coalescer.py — Metas por servo con "gana la última" para /api/move
+Arrastrar un slider dispara decenas de /api/move por segundo. En vez de
+encolarlos todos, cada ID guarda solo la meta más nueva y una tarea de
+fondo las manda juntas en un SYNC_WRITE, nunca más de una a la vez y a lo
+sumo a `rate_hz`: la latencia queda acotada a ~un envío + un periodo por
+rápido que llegue la entrada. La petición HTTP vuelve al instante con un
+número de secuencia; `done_seq` dice hasta cuál ya salió al bus.
+────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio, logging, time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+log = logging.getLogger("dxl.coalescer")
+
+# (ids, metas en unidades) → envía torque on + goal para esos servos
+Flush = Callable[[List[int], List[int]], Awaitable[None]]
+
+
+class GoalCoalescer:
+    def __init__(self, flush:Flush, rate_hz:float=100.0):
+        self.flush, self.period = flush, 1.0/rate_hz
+        self._pending: Dict[int, Tuple[int, int]] = {}      # sid → (meta, seq)
+        self._wake: Optional[asyncio.Event] = None          # se crea en start(): en 3.9 queda
+                                                            # atado al loop que exista al crearlo
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._inflight: Optional["asyncio.Task[None]"] = None   # envío en curso
+        self._halting = False
+        self.seq = self.done_seq = 0
+        self.submitted = self.sent = self.flushes = self.errors = self.aborted = 0
+        self.last_flush_ms = 0.0
+
+    # ---------- entrada ----------
+    def submit(self, sid:int, goal:int) -> int:
+        """Reemplaza la meta pendiente de `sid`; devuelve su número de secuencia."""
+        self.seq += 1; self.submitted += 1
+        self._pending[sid] = (goal, self.seq)
+        if self._wake is not None: self._wake.set()
+        return self.seq
+
+    def drop(self, ids:Optional[Iterable[int]]=None):
+        """Descarta metas pendientes (todas con ids=None): otro comando manda."""
+        if ids is None: self._pending.clear()
+        else:
+            for sid in ids: self._pending.pop(sid, None)
+
+    async def halt(self):
+        """Descarta lo pendiente y aborta el envío en curso sin esperar al bus:
+        lo que ya esté saliendo termina (el hilo del bus no corta a mitad) y
+        lo que siga encolado ya no sale, así que un torque off posterior queda
+        último aunque vaya por la cola urgente."""
+        self.drop()
+        t = self._inflight
+        if t is not None and not t.done():
+            self._halting = True
+            t.cancel()
+            await asyncio.wait([t])
+
+    # ---------- tarea ----------
+    def start(self):
+        if self._task: return
+        self._wake = asyncio.Event()
+        if self._pending: self._wake.set()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="dxl-coalescer")
+
+    async def stop(self):
+        if self._task is None: return
+        self._task.cancel()
+        try:    await self._task
+        except asyncio.CancelledError: pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            t0 = time.monotonic()
+            batch, self._pending = self._pending, {}
+            if batch:
+                ids = list(batch)
+                self._inflight = asyncio.ensure_future(self.flush(ids, [batch[i][0] for i in ids]))
+                try:
+                    await self._inflight
+                    self.sent += len(ids); self.flushes += 1
+                    self.done_seq = max(self.done_seq, max(s for _,s in batch.values()))
+                except asyncio.CancelledError:
+                    if not self._halting: raise         # stop(): se cancela la tarea entera
+                    self.aborted += 1
+                except Exception as e:
+                    self.errors += 1
+                    log.warning("no se pudieron enviar las metas %s: %s", ids, e)
+                finally:
+                    self._inflight, self._halting = None, False
+            self.last_flush_ms = (time.monotonic() - t0) * 1e3
+            await asyncio.sleep(max(0.0, self.period - (time.monotonic() - t0)))
+
+    def stats(self) -> Dict[str, object]:
+        return {"seq":self.seq, "done_seq":self.done_seq, "pending":len(self._pending),
+                "submitted":self.submitted, "sent":self.sent, "flushes":self.flushes,
+                "coalesced":self.submitted - self.sent - len(self._pending),
+                "errors":self.errors, "aborted":self.aborted, "last_flush_ms":round(self.last_flush_ms, 3)}
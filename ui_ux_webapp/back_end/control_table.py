@@ -0,0 +1,97 @@
+"""
+control_table.py — Mapa de registros AX/MX (Protocol 1.0) + planificador
+de lecturas. Junta los campos pedidos en el menor número de READ_DATA
+contiguos y los decodifica con struct (little-endian) en un solo paso.
+────────────────────────────────────────────────────────────────────────
+"""
+
+import struct
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+# nombre: (dirección, bytes)     ── EEPROM < 24 ≤ RAM
+REGS: Dict[str, Tuple[int, int]] = {
+    "MODEL_NUMBER":     (0, 2),
+    "FIRMWARE":         (2, 1),
+    "ID":               (3, 1),
+    "BAUD_RATE":        (4, 1),
+    "RETURN_DELAY":     (5, 1),
+    "CW_LIMIT":         (6, 2),
+    "CCW_LIMIT":        (8, 2),
+    "TEMP_LIMIT":       (11, 1),
+    "MIN_VOLTAGE":      (12, 1),
+    "MAX_VOLTAGE":      (13, 1),
+    "MAX_TORQUE":       (14, 2),
+    "RETURN_LEVEL":     (16, 1),
+    "ALARM_LED":        (17, 1),
+    "SHUTDOWN":         (18, 1),
+    "TORQUE_ENABLE":    (24, 1),
+    "LED":              (25, 1),
+    "CW_MARGIN":        (26, 1),
+    "CCW_MARGIN":       (27, 1),
+    "CW_SLOPE":         (28, 1),
+    "CCW_SLOPE":        (29, 1),
+    "GOAL_POSITION":    (30, 2),
+    "MOVING_SPEED":     (32, 2),
+    "TORQUE_LIMIT":     (34, 2),
+    "PRESENT_POSITION": (36, 2),
+    "PRESENT_SPEED":    (38, 2),
+    "PRESENT_LOAD":     (40, 2),
+    "PRESENT_VOLTAGE":  (42, 1),
+    "PRESENT_TEMP":     (43, 1),
+    "REGISTERED":       (44, 1),
+    "MOVING":           (46, 1),
+    "LOCK":             (47, 1),
+    "PUNCH":            (48, 2),
+}
+ADDR = {name: addr for name, (addr, _) in REGS.items()}
+
+MAX_GAP = 8       # bytes "de relleno" que salen más baratos que otra transacción
+MAX_READ = 32     # bytes por READ_DATA (cabe holgado en el buffer de los AX)
+
+
+class ReadSpan(NamedTuple):
+    addr:   int
+    length: int
+    fields: Tuple[str, ...]
+
+
+@lru_cache(maxsize=64)
+def _plan(fields:Tuple[str, ...], max_gap:int, max_len:int) -> Tuple[ReadSpan, ...]:
+    spans: List[ReadSpan] = []
+    for name in sorted(fields, key=lambda f: REGS[f][0]):
+        addr, size = REGS[name]
+        if spans:
+            last = spans[-1]
+            end  = last.addr + last.length
+            if addr - end <= max_gap and addr + size - last.addr <= max_len:
+                spans[-1] = ReadSpan(last.addr, max(end, addr+size)-last.addr,
+                                     last.fields + (name,))
+                continue
+        spans.append(ReadSpan(addr, size, (name,)))
+    return tuple(spans)
+
+
+def plan_reads(fields:Iterable[str], max_gap:int=MAX_GAP,
+               max_len:int=MAX_READ) -> Tuple[ReadSpan, ...]:
+    """Agrupa `fields` en el mínimo de lecturas contiguas (ordenadas por dirección)."""
+    unknown = [f for f in fields if f not in REGS]
+    if unknown: raise KeyError(f"Unknown register(s): {', '.join(unknown)}")
+    return _plan(tuple(sorted(set(fields))), max_gap, max_len)
+
+
+@lru_cache(maxsize=64)
+def _layout(span:ReadSpan) -> struct.Struct:
+    fmt, cur = "<", span.addr
+    for name in span.fields:                       # ya vienen ordenados
+        addr, size = REGS[name]
+        if addr > cur: fmt += f"{addr-cur}x"
+        fmt += "H" if size == 2 else "B"
+        cur = addr + size
+    if span.addr + span.length > cur: fmt += f"{span.addr+span.length-cur}x"
+    return struct.Struct(fmt)
+
+
+def decode_span(span:ReadSpan, data:bytes) -> Dict[str, int]:
+    """bytes de un ReadSpan → {campo: valor crudo}."""
+    return dict(zip(span.fields, _layout(span).unpack(data)))
@@ -0,0 +1,470 @@
+"""
+dxl_bus.py — Bus Dynamixel persistente (Protocol 1.0)
+El puerto se abre una sola vez al arrancar y lo comparten todos los
+endpoints. Si el FTDI se desconecta o hay errores de E/S se cierra y se
+reabre solo, con backoff exponencial para no martillar el driver.
+AsyncDxlBus expone el mismo bus a asyncio: toda la E/S serie la hace un
+único hilo dedicado y las corrutinas solo esperan un Future.
+────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio, itertools, logging, queue, threading, time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import serial
+try:
+    import termios                              # pyserial no envuelve termios.error (EIO al desenchufar)
+    PORT_ERRORS: tuple = (serial.SerialException, OSError, termios.error)
+except ImportError:                             # Windows
+    PORT_ERRORS = (serial.SerialException, OSError)
+
+from dxl_protocol import (BROADCAST, pkt_ping, pkt_read, pkt_bulk_read,
+                          PacketBuffer, StatusFramer, StatusPacket, is_echo)
+from servo_health import HealthMonitor
+from metrics import BusMetrics, DXL_QUEUE_WAIT
+from bus_recorder import BusRecorder, OK, TIMEOUT, PARTIAL, IO_ERROR
+
+log = logging.getLogger("dxl.bus")
+
+MAX_RDT = 254 * 2e-6                            # Return Delay Time máximo (registro 5 = 254)
+BULK_CHUNK = 16                                 # tramos por trabajo BULK_READ (acota la espera de URGENT)
+
+
+class BusUnavailable(Exception):
+    """El puerto serie no está disponible (desconectado o en backoff)."""
+
+class Stopped(Exception):
+    """Escritura pedida antes de un stop (AsyncDxlBus.fence): no se envía."""
+
+
+class DxlBus:
+    def __init__(self, port:str, baud:int, timeout:float=0.02,
+                 write_timeout:float=0.2,
+                 backoff_min:float=0.1, backoff_max:float=5.0,
+                 health:Optional[HealthMonitor]=None,
+                 recorder:Optional[BusRecorder]=None):
+        self.port, self.baud          = port, baud
+        self.timeout, self.write_timeout = timeout, write_timeout
+        self.backoff_min, self.backoff_max = backoff_min, backoff_max
+        self.lock     = threading.Lock()        # <── un único dueño del puerto
+        self._ser: Optional[serial.Serial] = None
+        self._backoff = backoff_min
+        self._retry_at= 0.0                     # monotonic del próximo intento
+        self.opens    = 0                       # aperturas (1 = sin reconexiones)
+        self._dtr     = True                    # False: pty/emulador, sin línea DTR
+        self._rx      = True                    # línea en RX (DTR alto) tras el último _tx
+        self._echoes: List[bytes] = []          # encadenados cuyo eco aún puede llegar
+        self.echo: Optional[bool] = None        # ¿el adaptador devuelve lo enviado? (se aprende)
+        self.return_level: Dict[int, int] = {}  # sid → Status Return Level (sin dato: 2)
+        self.t_enq: Optional[float] = None      # lo pone AsyncDxlBus antes de cada trabajo
+        self.framer   = StatusFramer()          # buffer RX reutilizado (bajo `lock`)
+        self._txbuf   = PacketBuffer()          # ídem para las escrituras
+        self.health   = health or HealthMonitor(timeout, baud)
+        self.last_rtt: Optional[float] = None   # del último exchange (bajo `lock`)
+        self.last_bad = 0
+        self.metrics  = BusMetrics(port, baud)  # /metrics: latencias, lock, bytes
+        self.recorder = recorder                # grabación TX/RX opcional (bus_recorder)
+
+    # ---------- ciclo de vida ----------
+    @property
+    def connected(self) -> bool:
+        return self._ser is not None and self._ser.is_open
+
+    def start(self) -> bool:
+        """Intenta abrir el puerto; si falla queda en backoff (no lanza)."""
+        with self.lock:
+            try:
+                self._ensure_open()
+                return True
+            except BusUnavailable as e:
+                log.warning("bus no disponible al arrancar: %s", e)
+                return False
+
+    def close(self):
+        with self.lock:
+            self._drop()
+
+    # ---------- internos (llamar con lock) ----------
+    def _ensure_open(self) -> serial.Serial:
+        if self.connected: return self._ser
+        now = time.monotonic()
+        if now < self._retry_at:
+            raise BusUnavailable(f"{self.port}: reintento en {self._retry_at-now:.2f}s")
+        try:
+            self._ser = serial.Serial(self.port, self.baud, timeout=self.timeout,
+                                      write_timeout=self.write_timeout)
+        except PORT_ERRORS as e:
+            self._retry_at = now + self._backoff
+            self._backoff  = min(self._backoff*2, self.backoff_max)
+            raise BusUnavailable(f"{self.port}: {e}") from e
+        try:
+            self._ser.dtr = True
+            self._dtr = self._rx = True
+        except OSError:                         # ENOTTY en un pty: dirección por hardware
+            self._dtr = False
+        self.opens += 1
+        if self.opens > 1: log.info("bus reabierto en %s", self.port)
+        self._backoff, self._retry_at = self.backoff_min, 0.0
+        return self._ser
+
+    def _drop(self):
+        if self._ser is not None:
+            try:    self._ser.close()
+            except PORT_ERRORS: pass
+        self._ser = None
+
+    # ---------- transacción ----------
+    def _tx(self, ser:serial.Serial, pkt:bytes):
+        if self._dtr: ser.dtr = False
+        ser.reset_input_buffer()
+        ser.write(pkt);  ser.flush()            # también drena lo encadenado antes
+        while ser.out_waiting: time.sleep(0)
+        time.sleep(0.00005)     # cambio RX
+        if self._dtr: ser.dtr = self._rx = True
+
+    def _io_error(self, e:Exception) -> BusUnavailable:
+        log.warning("error de E/S en %s, se reconectará: %s", self.port, e)
+        self._drop()
+        self._retry_at = time.monotonic() + self._backoff
+        self._echoes.clear()
+        self.echo = None                        # al reconectar puede ser otro adaptador
+        return BusUnavailable(f"{self.port}: {e}")
+
+    @staticmethod
+    def _set_timeout(ser:serial.Serial, t:float):
+        if ser.timeout != t: ser.timeout = t      # pyserial solo reconfigura si cambia
+
+    def answers(self, sid:int, ins:int) -> bool:
+        """¿Devuelve `sid` status packet a la instrucción `ins`? Status Return
+        Level: 0 solo PING, 1 además READ, 2 todo (sin dato, 2: el de fábrica)."""
+        if sid == BROADCAST: return False
+        lvl = self.return_level.get(sid, 2)
+        return ins == 0x01 or lvl >= 2 or (lvl == 1 and ins == 0x02)
+
+    def transact(self, pkt:bytes, expect:int=0) -> bytes:
+        """TX + (opcional) RX de `expect` bytes crudos con el puerto ya abierto.
+        Con expect=0 no se lee nada, pero si el servo igual contesta (Return
+        Level) el status se consume para que no choque con lo siguiente."""
+        t_req = self._t_req()
+        with self.lock:
+            if expect: return self._transact(pkt, expect, t_req)
+            self._send(pkt, t_req)
+            return b""
+
+    def write_data(self, sid:int, addr:int, data:Sequence[int]) -> Optional[int]:
+        """WRITE_DATA armado en el buffer TX del bus (sin listas ni bytes nuevos).
+        Devuelve los bits de error del status, o None si no hubo (o no toca)."""
+        t_req = self._t_req()
+        with self.lock:
+            return self._send(self._txbuf.write(sid, addr, data), t_req)
+
+    def sync_write(self, addr:int, rows:Sequence[Tuple[int, Sequence[int]]]):
+        """SYNC_WRITE armado en el buffer TX del bus (broadcast: sale encadenado)."""
+        t_req = self._t_req()
+        with self.lock:
+            self._send(self._txbuf.sync_write(addr, rows), t_req)
+
+    def _t_req(self) -> float:
+        """Desde cuándo espera la transacción: desde que AsyncDxlBus encoló el
+        trabajo (el lock solo lo toma el hilo de E/S, la espera real es la cola)."""
+        t, self.t_enq = self.t_enq, None
+        return time.monotonic() if t is None else t
+
+    def _send(self, pkt:bytes, t_req:float) -> Optional[int]:
+        sid = pkt[2]
+        if not self.answers(sid, pkt[4]):
+            self._pipe(pkt, t_req); return None
+        sts = self._exchange(pkt, 1, 6, self.health.timeout_for(sid, len(pkt)+6), t_req)
+        for st in sts:
+            if st.id == sid:
+                self.health.record(sid, self.last_rtt, self.last_bad)
+                return st.error
+        return None                             # sin status: no se cuenta como fallo (¿nivel < 2?)
+
+    def _pipe(self, pkt:bytes, t_req:float):
+        """Paquete sin respuesta posible: al FIFO y se sigue, sin flush, espera
+        de out_waiting ni giro a RX; varios seguidos salen pegados. El próximo
+        _tx drena todo antes de escuchar y exchange descarta sus ecos."""
+        t_acq = time.monotonic()
+        ser = self._ensure_open()
+        t_io, outcome = time.monotonic(), IO_ERROR
+        try:
+            if self._dtr and self._rx: ser.dtr = self._rx = False
+            ser.write(pkt)
+            self._echoes.append(bytes(pkt))
+            if len(self._echoes) > 8: del self._echoes[0]
+            outcome = OK
+        except PORT_ERRORS as e:
+            raise self._io_error(e) from e
+        finally:
+            t_end = time.monotonic()
+            self.metrics.txn(pkt[4], t_req, t_acq, t_io, t_end, len(pkt), 0)
+            if self.recorder is not None:
+                self.recorder.record(t_io, pkt, t_end, None, outcome)
+
+    def _transact(self, pkt:bytes, expect:int, t_req:float) -> bytes:
+        t_acq = time.monotonic()
+        ser = self._ensure_open()
+        t_io, resp, outcome = time.monotonic(), b"", IO_ERROR
+        self._echoes.clear()                    # lectura cruda: los ecos quedan en `resp`
+        try:
+            self._tx(ser, pkt)
+            self._set_timeout(ser, self.timeout)
+            resp = ser.read(expect)
+            outcome = OK if len(resp) == expect else PARTIAL if resp else TIMEOUT
+            return resp
+        except PORT_ERRORS as e:
+            raise self._io_error(e) from e
+        finally:
+            t_end = time.monotonic()
+            self.metrics.txn(pkt[4], t_req, t_acq, t_io, t_end, len(pkt), len(resp))
+            if self.recorder is not None:
+                self.recorder.record(t_io, pkt, t_end, resp, outcome)
+
+    def exchange(self, pkt:bytes, replies:int, expect:int,
+                 timeout:Optional[float]=None) -> List[StatusPacket]:
+        """TX + hasta `replies` status packets válidos (se esperan `expect`
+        bytes en total). El ruido, el eco y los paquetes corruptos los
+        descarta el framer en vez de invalidar toda la respuesta."""
+        t_req = self._t_req()
+        with self.lock:
+            return self._exchange(pkt, replies, expect, timeout, t_req)
+
+    def _exchange(self, pkt:bytes, replies:int, expect:int,
+                  timeout:Optional[float], t_req:float) -> List[StatusPacket]:
+        t_acq = time.monotonic()
+        ser, fr = self._ensure_open(), self.framer
+        out: List[StatusPacket] = []
+        t_io, nrx, bad0 = time.monotonic(), 0, fr.bad_checksums
+        t_tx, outcome, self.last_rtt = t_io, IO_ERROR, None
+        rx = bytearray() if self.recorder is not None else None
+        lead = self._echoes + [pkt]             # ecos posibles delante de la respuesta
+        self._echoes = []
+        # con el eco ya conocido se descartan exactamente los bytes enviados (un
+        # status puede ser idéntico a su instrucción: PING con error 0x01); sin
+        # saberlo aún, se compara el contenido y se aprende de un READ inequívoco
+        skip = sum(map(len, lead)) if self.echo else 0
+        saw_echo = False
+        try:
+            self._tx(ser, pkt)
+            t_tx = time.monotonic()
+            deadline = t_tx + (self.timeout if timeout is None else timeout)
+            fr.clear()
+            want = expect + skip
+            while True:
+                self._set_timeout(ser, max(0.0, deadline - time.monotonic()))
+                chunk = ser.read(want)
+                nrx += len(chunk)
+                if rx is not None: rx += chunk
+                if skip:
+                    d = min(skip, len(chunk))
+                    chunk, skip = chunk[d:], skip - d
+                fr.feed(chunk)
+                for st in fr.packets():
+                    if self.echo is None and not out and any(is_echo(st, p) for p in lead):
+                        saw_echo = True; continue
+                    if not out: self.last_rtt = time.monotonic() - t_tx
+                    out.append(st)
+                if len(out) >= replies or time.monotonic() >= deadline: break
+                # falta algo (basura delante o respuesta parcial): lo que haya o 1 B
+                want = max(1, ser.in_waiting)
+            if self.echo is None and len(lead) == 1 and pkt[4] == 0x02 and pkt[6] != 2 \
+                    and (saw_echo or out):      # READ de ≠ 2 B: el status no se parece al paquete
+                self.echo = saw_echo
+                log.info("%s: el adaptador %s", self.port,
+                         "devuelve el eco de lo enviado" if saw_echo else "no devuelve eco")
+            self.last_bad = fr.bad_checksums - bad0
+            outcome = OK if len(out) >= replies else PARTIAL if out else TIMEOUT
+            return out
+        except PORT_ERRORS as e:
+            raise self._io_error(e) from e
+        finally:
+            t_end = time.monotonic()
+            self.metrics.txn(pkt[4], t_req, t_acq, t_io, t_end,
+                             len(pkt), nrx, fr.bad_checksums - bad0)
+            if rx is not None:                  # RX fechado en el primer paquete válido
+                self.recorder.record(t_tx, pkt, t_end if self.last_rtt is None
+                                     else t_tx + self.last_rtt, rx, outcome)
+
+    def read_data(self, sid:int, addr:int, length:int) -> Optional[bytes]:
+        """READ_DATA → datos, o None si no hay status packet válido de `sid`
+        (o si su circuito está abierto: entonces no se toca el bus)."""
+        hm = self.health
+        if not hm.allow(sid): return None
+        sts = self.exchange(pkt_read(sid, addr, length), 1, 6+length,
+                            hm.timeout_for(sid, 8+6+length))
+        for st in sts:
+            if st.id == sid and len(st.params) == length:
+                hm.record(sid, self.last_rtt, self.last_bad)
+                self.metrics.servo_ok(sid, self.last_rtt)
+                return st.params
+        hm.record(sid, None, self.last_bad)
+        self.metrics.servo_timeout(sid)
+        return None
+
+    def ping(self, sid:int) -> bool:
+        """PING con el timeout fijo; ignora el circuit breaker (lo usa el sondeo)."""
+        ok = any(st.id == sid for st in self.exchange(pkt_ping(sid), 1, 6))
+        self.health.record(sid, self.last_rtt if ok else None, self.last_bad)
+        return ok
+
+    def bulk_timeout(self, items:Sequence[Tuple[int,int,int]]) -> float:
+        """Cada servo contesta al terminar el anterior (y si uno calla, los que
+        siguen también): un timeout base + cable y Return Delay máximo por
+        respuesta, no un timeout entero por ID. Acota lo que tarda un trabajo."""
+        return self.timeout + sum((6+n)*10/self.baud + MAX_RDT for _,_,n in items)
+
+    def bulk_read(self, items:Sequence[Tuple[int,int,int]]) -> Dict[int, Optional[bytes]]:
+        """BULK_READ: [(id, addr, largo), ...] → {id: datos | None} en una ráfaga.
+        Los IDs con el circuito abierto no se piden. Cada servo contesta tras
+        oír al anterior: si uno calla, los de detrás tampoco hablan. Solo el
+        primero que calla cuenta como timeout; los siguientes quedan en None
+        sin tocar su salud (no llegaron a intentarlo). Cuando el circuito del
+        que calla se abre, sale de la cadena y el resto vuelve a contestar."""
+        hm = self.health
+        out: Dict[int, Optional[bytes]] = dict.fromkeys(sid for sid,_,_ in items)
+        items = [it for it in items if hm.allow(it[0])]
+        if not items: return out
+        want = {sid:n for sid,_,n in items}
+        sts = self.exchange(pkt_bulk_read(items), len(items),
+                            sum(6+n for _,_,n in items), self.bulk_timeout(items))
+        for st in sts:
+            if len(st.params) == want.get(st.id, -1): out[st.id] = st.params
+        silent = False
+        for sid in want:                        # RTT solo es del primero de la ráfaga
+            if out[sid] is None:
+                if silent: continue             # cadena cortada antes: no intentado
+                silent = True
+                self.metrics.servo_timeout(sid)
+                hm.record(sid, None)
+            else:
+                hm.record(sid, self.last_rtt if sid == items[0][0]
+                          else (hm[sid].srtt or self.last_rtt))
+        return out
+
+
+# ───────────── Fachada asyncio ─────────────
+URGENT, NORMAL = 0, 1                           # prioridad de un trabajo (menor = antes)
+_LAST = 9                                       # centinela de cierre: tras todo lo encolado
+PRIO_NAMES = {URGENT:"urgent", NORMAL:"normal"}
+
+READS = (0x01, 0x02, 0x92)                      # PING, READ, BULK_READ: un stop no los anula
+
+# (fn, args, futuro, loop, t encolado, época: None = lectura, nunca se descarta)
+_Job = Tuple[Callable[..., Any], tuple, "asyncio.Future[Any]", asyncio.AbstractEventLoop,
+             float, Optional[int]]
+
+def _resolve(fut:"asyncio.Future[Any]", res:Any, exc:Optional[BaseException]):
+    if fut.done(): return                       # cancelado mientras esperaba
+    if exc is not None: fut.set_exception(exc)
+    else:               fut.set_result(res)
+
+
+class AsyncDxlBus:
+    """`await bus.read(...)` / `await bus.write(...)` sin ocupar hilos del
+    threadpool: los trabajos van a un único hilo lector/escritor por una
+    cola con prioridad. Los URGENT (torque off, /api/torque) pasan delante
+    de todo lo encolado; dentro de una prioridad se respeta el orden. Un
+    trabajo ya empezado no se corta (una respuesta a medio llegar chocaría
+    con el paquete urgente en el half-duplex): el peor caso es esperar la
+    transacción en curso, ver DxlRouter.urgent_bound().
+
+    Saltar la cola no basta para un stop: lo NORMAL ya encolado (torque on,
+    metas) saldría después. fence() abre una época nueva y toda escritura
+    de una época anterior, encolada o por encolar, falla con Stopped."""
+
+    def __init__(self, bus:DxlBus):
+        self.bus = bus
+        self._jobs: "queue.PriorityQueue[Tuple[int, int, Optional[_Job]]]" = queue.PriorityQueue()
+        self._seq = itertools.count()           # FIFO dentro de cada prioridad
+        self._thread: Optional[threading.Thread] = None
+        self._wait = {p:DXL_QUEUE_WAIT.labels(bus.port, n) for p,n in PRIO_NAMES.items()}
+        self.epoch = 0                          # +1 en cada stop (fence)
+        self.fenced = 0                         # escrituras descartadas por un stop
+
+    @property
+    def connected(self) -> bool: return self.bus.connected
+    @property
+    def opens(self) -> int:      return self.bus.opens
+    @property
+    def pending(self) -> int:    return self._jobs.qsize()
+    @property
+    def health(self) -> HealthMonitor: return self.bus.health
+
+    # ---------- ciclo de vida ----------
+    async def start(self) -> bool:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, name="dxl-io", daemon=True)
+            self._thread.start()
+        return await self.call(self.bus.start)
+
+    async def close(self):
+        if self._thread is None: return
+        await self.call(self.bus.close)
+        self._jobs.put((_LAST, next(self._seq), None))
+        self._thread = None
+
+    # ---------- hilo de E/S ----------
+    def _worker(self):
+        while True:
+            prio, _, job = self._jobs.get()
+            if job is None: return
+            fn, args, fut, loop, t_enq, epoch = job
+            if fut.done(): continue             # la corrutina ya no espera: no se envía
+            if epoch is not None and epoch < self.epoch:
+                self.fenced += 1
+                loop.call_soon_threadsafe(_resolve, fut, None,
+                                          Stopped(f"{self.bus.port}: write before stop"))
+                continue
+            self._wait[prio].observe(time.monotonic() - t_enq)
+            res, exc = None, None
+            self.bus.t_enq = t_enq
+            try:                   res = fn(*args)
+            except BaseException as e: exc = e
+            loop.call_soon_threadsafe(_resolve, fut, res, exc)
+
+    def fence(self):
+        """Stop: toda escritura de antes (o con una época vieja) queda anulada."""
+        self.epoch += 1
+
+    async def call(self, fn:Callable[..., Any], *args:Any, prio:int=NORMAL,
+                   epoch:Optional[int]=None) -> Any:
+        """`epoch` (escrituras): la de la operación que la pide; si ya hubo un
+        stop desde entonces, ni se encola."""
+        if self._thread is None: raise BusUnavailable("bus not started")
+        if epoch is not None and epoch < self.epoch:
+            self.fenced += 1
+            raise Stopped(f"{self.bus.port}: write before stop")
+        loop = asyncio.get_running_loop()
+        fut  = loop.create_future()
+        self._jobs.put((prio, next(self._seq), (fn, args, fut, loop, time.monotonic(), epoch)))
+        return await fut
+
+    # ---------- API ----------
+    def _epoch(self, epoch:Optional[int]) -> int:
+        return self.epoch if epoch is None else epoch
+
+    async def transact(self, pkt:bytes, expect:int=0, prio:int=NORMAL,
+                       epoch:Optional[int]=None) -> bytes:
+        return await self.call(self.bus.transact, pkt, expect, prio=prio,
+                               epoch=None if pkt[4] in READS else self._epoch(epoch))
+
+    async def read(self, sid:int, addr:int, length:int) -> Optional[bytes]:
+        return await self.call(self.bus.read_data, sid, addr, length)
+
+    async def ping(self, sid:int) -> bool:
+        return await self.call(self.bus.ping, sid)
+
+    async def bulk_read(self, items:Sequence[Tuple[int,int,int]]) -> Dict[int, Optional[bytes]]:
+        out: Dict[int, Optional[bytes]] = {}
+        for i in range(0, len(items), BULK_CHUNK):  # trabajos cortos: lo urgente entra entre medio
+            out.update(await self.call(self.bus.bulk_read, items[i:i+BULK_CHUNK]))
+        return out
+
+    async def write(self, sid:int, addr:int, *data:int, prio:int=NORMAL,
+                    epoch:Optional[int]=None):
+        await self.call(self.bus.write_data, sid, addr, data, prio=prio,
+                        epoch=self._epoch(epoch))
+
+    async def sync_write(self, addr:int, rows:Sequence[Tuple[int, Sequence[int]]],
+                         prio:int=NORMAL, epoch:Optional[int]=None):
+        await self.call(self.bus.sync_write, addr, rows, prio=prio, epoch=self._epoch(epoch))
@@ -0,0 +1,259 @@
+"""
+dxl_emulator.py — Bus Dynamixel virtual (Protocol 1.0) sobre un pty
+Emula servos AX-12A / AX-18A / AX-12W / MX-28 con la tabla de control
+común (0–49; BULK_READ solo lo atienden los MX),
+tiempos de cable a la velocidad configurada, Return Delay Time, Status
+Return Level y fallos inyectables (paquetes perdidos/corruptos, IDs que
+no existen). Sirve para medir el backend sin hardware:
+
+    python dxl_emulator.py --ids 1,2,3,4 --link /tmp/dxl0
+    DXL_PORT=/tmp/dxl0 uvicorn app:app
+────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse, os, random, select, termios, time, tty
+from typing import Dict, List, Optional
+
+from dxl_protocol import checksum, BROADCAST
+
+MODELS = {"AX-12A": 0x000C, "AX-18A": 0x0012, "AX-12W": 0x012C, "MX-28": 0x001D}
+MAX_RPM = {0x000C: 59.0, 0x0012: 97.0, 0x012C: 470.0, 0x001D: 55.0}   # sin carga, 12 V
+BULK_MODELS = {0x001D}                                  # firmware con BULK_READ (0x92)
+
+BOTHER = 0o010000                                       # Linux: velocidad no estándar (termios2)
+
+# Error bits del status packet
+ERR_RANGE, ERR_CHECKSUM, ERR_INSTRUCTION = 0x08, 0x10, 0x40
+
+
+class VirtualServo:
+    """Tabla de control + modelo cinemático simple (va hacia Goal a Moving Speed)."""
+
+    def __init__(self, sid:int, model:int=MODELS["AX-12A"]):
+        t = bytearray(50)
+        t[0:2]   = model.to_bytes(2, "little")
+        t[2]     = 24                                   # firmware
+        t[3]     = sid
+        t[4]     = 1                                    # 1 Mbps
+        t[5]     = 250                                  # 500 µs
+        t[8:10]  = (1023).to_bytes(2, "little")         # CCW limit
+        t[11], t[12], t[13] = 70, 60, 140
+        t[14:16] = (1023).to_bytes(2, "little")         # max torque
+        t[16]    = 2                                    # status return level
+        t[17] = t[18] = 0x24
+        t[26] = t[27] = 1; t[28] = t[29] = 32           # compliance
+        t[30:32] = (512).to_bytes(2, "little")          # goal
+        t[34:36] = (1023).to_bytes(2, "little")         # torque limit
+        t[36:38] = (512).to_bytes(2, "little")          # present position
+        t[42], t[43] = 120, 35                          # 12.0 V, 35 °C
+        t[48:50] = (32).to_bytes(2, "little")           # punch
+        self.table = t
+        self.registered: Optional[bytes] = None          # REG_WRITE pendiente (addr + datos)
+        self._pos   = 512.0
+        self._t     = time.monotonic()
+
+    def _u16(self, a:int) -> int: return self.table[a] | (self.table[a+1] << 8)
+
+    def step(self):
+        """Avanza la posición presente hacia la meta según el tiempo transcurrido."""
+        now = time.monotonic()
+        dt, self._t = now - self._t, now
+        t, goal = self.table, self._u16(30)
+        moving = False
+        if t[24]:                                       # solo con torque
+            rpm   = self._u16(32) * 0.111 or MAX_RPM.get(self._u16(0), 59.0)
+            step  = rpm * 6 * dt * 1023 / 300           # unidades en dt
+            err   = goal - self._pos
+            moving = abs(err) > 0.5
+            self._pos += max(-step, min(step, err))
+            spd = int(min(1023, rpm / 0.111)) if moving else 0
+            t[38:40] = (spd | (0x400 if err < 0 and moving else 0)).to_bytes(2, "little")
+            t[40:42] = (min(1023, int(abs(err)) // 4) | (0x400 if err < 0 else 0)).to_bytes(2, "little")
+        else:
+            t[38:40] = t[40:42] = b"\x00\x00"
+        t[36:38] = int(round(self._pos)).to_bytes(2, "little")
+        t[46]    = int(moving)
+
+    def read(self, addr:int, n:int) -> Optional[bytes]:
+        if addr + n > len(self.table): return None
+        self.step()
+        return bytes(self.table[addr:addr+n])
+
+    def write(self, addr:int, data:bytes) -> bool:
+        if addr + len(data) > len(self.table): return False
+        self.step()
+        for i, b in enumerate(data):
+            a = addr + i
+            if a in (0, 1, 2) or 36 <= a <= 46: continue  # solo lectura
+            self.table[a] = b
+        return True
+
+
+class VirtualBus:
+    def __init__(self, servos:Dict[int, VirtualServo], baud:int=1_000_000,
+                 drop:float=0.0, corrupt:float=0.0, seed:Optional[int]=None,
+                 echo:bool=False, alarm:int=0):
+        self.servos, self.baud = servos, baud
+        self.drop, self.corrupt = drop, corrupt
+        self.echo  = echo                    # adaptador sin control de dirección: RX ve el TX
+        self.alarm = alarm                   # bits de error en todo status (p. ej. 0x01 voltaje)
+        self.rng = random.Random(seed)
+        self.rx = self.tx = self.dropped = self.corrupted = 0
+
+    def byte_time(self, n:int) -> float: return n * 10 / self.baud    # 8N1
+
+    # ---------- protocolo ----------
+    def status(self, s:VirtualServo, err:int=0, data:bytes=b"") -> bytes:
+        p = [s.table[3], len(data)+2, err | self.alarm, *data]
+        return bytes([0xFF, 0xFF, *p, checksum(p)])
+
+    def handle(self, pkt:bytes) -> List[bytes]:
+        """Paquete de instrucción completo → lista de status packets a devolver."""
+        sid, ins, params = pkt[2], pkt[4], pkt[5:-1]
+        if checksum(pkt[2:-1]) != pkt[-1]:
+            s = self.servos.get(sid)
+            return [self.status(s, ERR_CHECKSUM)] if s and s.table[16] else []
+
+        if ins == 0x83:                                  # SYNC_WRITE
+            addr, n = params[0], params[1]
+            for i in range(2, len(params), n+1):
+                s = self.servos.get(params[i])
+                if s: s.write(addr, params[i+1:i+1+n])
+            return []
+
+        if ins == 0x92:                                  # BULK_READ: responde en orden
+            out = []                                     # cada uno espera al anterior:
+            for i in range(1, len(params) - 2, 3):       # si uno calla, callan los de detrás
+                n, s = params[i], self.servos.get(params[i+1])
+                if s is None or s._u16(0) not in BULK_MODELS or not s.table[16]: break
+                got = s.read(params[i+2], n)
+                out.append(self.status(s, ERR_RANGE) if got is None else self.status(s, 0, got))
+            return out
+
+        targets = list(self.servos.values()) if sid == BROADCAST else \
+                  [self.servos[sid]] if sid in self.servos else []
+        out = []
+        for s in targets:
+            err, data = 0, b""
+            if ins == 0x01:   pass                       # PING
+            elif ins == 0x02:                            # READ_DATA
+                got = s.read(params[0], params[1]) if len(params) == 2 else None
+                if got is None: err = ERR_RANGE
+                else:           data = got
+            elif ins == 0x03:                            # WRITE_DATA
+                if not s.write(params[0], params[1:]): err = ERR_RANGE
+            elif ins == 0x04:                            # REG_WRITE
+                s.registered = bytes(params); s.table[44] = 1
+            elif ins == 0x05:                            # ACTION
+                if s.registered: s.write(s.registered[0], s.registered[1:])
+                s.registered, s.table[44] = None, 0
+            elif ins == 0x06:                            # RESET (aquí conserva el ID)
+                s.__init__(s.table[3], s._u16(0))
+            else:
+                err = ERR_INSTRUCTION
+            level = s.table[16]
+            replies = ins == 0x01 or (ins == 0x02 and level >= 1) or level >= 2
+            if sid != BROADCAST and replies:
+                out.append(self.status(s, err, data))
+        return out
+
+    def baud_matches(self, fd:int) -> bool:
+        """En un pty el maestro ve la velocidad que configuró el cliente: a otra
+        velocidad los servos reales solo verían basura, así que no contestan."""
+        try:    speed = termios.tcgetattr(fd)[4]
+        except termios.error: return True
+        return speed == getattr(termios, f"B{self.baud}", BOTHER)
+
+    # ---------- bucle del pty ----------
+    def serve(self, fd:int):
+        buf = bytearray()
+        while True:
+            select.select([fd], [], [])
+            try:    chunk = os.read(fd, 1024)
+            except OSError: time.sleep(0.01); continue   # cliente cerrado
+            t_rx = time.monotonic()
+            buf += chunk
+            while True:
+                start = buf.find(b"\xFF\xFF")
+                if start < 0:                            # conserva un 0xFF suelto al final
+                    del buf[:len(buf) - (buf[-1:] == b"\xFF")]; break
+                del buf[:start]
+                if len(buf) < 4: break
+                if buf[2] == 0xFF: del buf[:1]; continue # FF FF FF: resincroniza
+                end = 4 + buf[3]
+                if len(buf) < end: break
+                pkt = bytes(buf[:end]); del buf[:end]
+                self.rx += 1
+                if self.baud_matches(fd): self.respond(fd, pkt, t_rx)
+
+    def respond(self, fd:int, pkt:bytes, t_rx:float):
+        t = t_rx + self.byte_time(len(pkt))                 # fin del paquete en el cable
+        if self.echo: os.write(fd, pkt)
+        for resp in self.handle(pkt):
+            s = self.servos[resp[2]]
+            t += s.table[5] * 2e-6                           # Return Delay Time
+            if self.rng.random() < self.drop:
+                self.dropped += 1; continue
+            if self.rng.random() < self.corrupt:
+                b = bytearray(resp); b[self.rng.randrange(2, len(b))] ^= 0x5A
+                resp = bytes(b); self.corrupted += 1
+            _sleep_until(t)
+            os.write(fd, resp)
+            t += self.byte_time(len(resp))
+            self.tx += 1
+
+
+def _sleep_until(t:float):
+    """sleep() para lo grueso y espera activa para los últimos ~200 µs."""
+    d = t - time.monotonic()
+    if d > 3e-4: time.sleep(d - 2e-4)
+    while time.monotonic() < t: pass
+
+
+def open_pty(link:Optional[str]=None):
+    master, slave = os.openpty()
+    tty.setraw(master); tty.setraw(slave)
+    name = os.ttyname(slave)
+    if link:
+        if os.path.islink(link): os.unlink(link)
+        os.symlink(name, link)
+    return master, slave, link or name
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Emulador de bus Dynamixel Protocol 1.0 en un pty")
+    ap.add_argument("--ids", default="1,2,3,4")
+    ap.add_argument("--models", default="AX-18A,AX-12A,AX-12A,AX-12W",
+                    help="modelo por ID (se repite el último)")
+    ap.add_argument("--baud", type=int, default=1_000_000)
+    ap.add_argument("--return-delay", type=int, default=None, help="registro 5 (×2 µs)")
+    ap.add_argument("--return-level", type=int, default=None, help="registro 16 (0/1/2)")
+    ap.add_argument("--drop", type=float, default=0.0, help="probabilidad de respuesta perdida")
+    ap.add_argument("--corrupt", type=float, default=0.0, help="probabilidad de byte corrupto")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--echo", action="store_true", help="devuelve lo recibido (sin control de dirección)")
+    ap.add_argument("--alarm", type=lambda v: int(v, 0), default=0,
+                    help="bits de error en todo status (0x01 = voltaje)")
+    ap.add_argument("--link", default=None, help="symlink estable al pty (p. ej. /tmp/dxl0)")
+    a = ap.parse_args()
+
+    ids    = [int(i) for i in a.ids.split(",") if i]
+    models = [MODELS[m] for m in a.models.split(",")]
+    servos = {sid: VirtualServo(sid, models[min(i, len(models)-1)]) for i, sid in enumerate(ids)}
+    for s in servos.values():
+        if a.return_delay is not None: s.table[5]  = a.return_delay
+        if a.return_level is not None: s.table[16] = a.return_level
+
+    master, _slave, path = open_pty(a.link)
+    print(f"DXL_PORT={path}  ids={ids}  baud={a.baud}", flush=True)
+    bus = VirtualBus(servos, a.baud, a.drop, a.corrupt, a.seed, a.echo, a.alarm)
+    try:
+        bus.serve(master)
+    except KeyboardInterrupt:
+        print(f"\nrx={bus.rx} tx={bus.tx} dropped={bus.dropped} corrupted={bus.corrupted}")
+    finally:
+        if a.link and os.path.islink(a.link): os.unlink(a.link)
+
+
+if __name__ == "__main__":
+    main()
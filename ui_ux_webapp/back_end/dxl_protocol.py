@@ -0,0 +1,183 @@
+"""
+dxl_protocol.py — Construcción de paquetes Dynamixel Protocol 1.0
+Funciones puras (sin E/S) que comparten app.py, el bus y los scripts de
+basic_br_control, más un framer incremental de status packets que tolera
+ruido/eco delante de la respuesta. Los paquetes inmutables (PING, READ,
+ACTION) se memorizan por argumentos; las escrituras se arman sin listas
+intermedias o, en el hilo del bus, dentro de un buffer preasignado.
+────────────────────────────────────────────────────────────────────────
+"""
+
+import struct
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+
+BROADCAST = 0xFE
+
+def checksum(payload: Iterable[int]) -> int: return (~sum(payload)) & 0xFF
+
+def _frame(body:bytes) -> bytes:
+    """ID..último parámetro → FF FF + body + checksum."""
+    return b"\xFF\xFF" + body + bytes(((~sum(body)) & 0xFF,))
+
+def pkt_write(sid:int, addr:int, *data:int) -> bytes:
+    return _frame(bytes((sid, 3+len(data), 3, addr, *data)))
+
+@lru_cache(maxsize=256)
+def pkt_ping(sid:int) -> bytes:
+    return _frame(bytes((sid, 2, 1)))
+
+@lru_cache(maxsize=2048)                    # (id, addr, largo): pocos distintos por bus
+def pkt_read(sid:int, addr:int, length:int) -> bytes:
+    return _frame(bytes((sid, 4, 2, addr, length)))
+
+def pkt_reg_write(sid:int, addr:int, *data:int) -> bytes:
+    return _frame(bytes((sid, 3+len(data), 4, addr, *data)))
+
+@lru_cache(maxsize=256)
+def pkt_action(sid:int=BROADCAST) -> bytes:
+    return _frame(bytes((sid, 2, 5)))
+
+def pkt_sync_write(addr:int, rows:Sequence[Tuple[int,Sequence[int]]]) -> bytes:
+    """SYNC_WRITE (0x83): rows = [(id, data), ...] con data del mismo largo."""
+    n = len(rows[0][1])
+    size = (n+1)*len(rows)+4
+    if size > 255: raise ValueError("SYNC_WRITE too long")
+    body = bytearray((BROADCAST, size, 0x83, addr, n))
+    for sid,data in rows: body.append(sid); body += bytes(data)
+    return _frame(bytes(body))
+
+def pkt_bulk_read(items:Sequence[Tuple[int,int,int]]) -> bytes:
+    """BULK_READ (0x92, serie MX): items = [(id, addr, largo), ...], un tramo
+    distinto por ID. Los servos responden en el orden de la lista."""
+    size = 3*len(items)+3
+    if size > 255: raise ValueError("BULK_READ too long")
+    body = bytearray((BROADCAST, size, 0x92, 0x00))
+    for sid,addr,n in items: body += bytes((n, sid, addr))
+    return _frame(bytes(body))
+
+
+class PacketBuffer:
+    """Buffer TX preasignado: WRITE / REG_WRITE / SYNC_WRITE se escriben en
+    su sitio y se devuelve una vista (memoryview) válida hasta el siguiente
+    uso; las vistas de cada largo se crean una vez. Uno por dueño (el hilo
+    de E/S de cada bus): no se comparte entre hilos."""
+
+    def __init__(self, size:int=260):
+        self._buf = bytearray(size)
+        self._buf[0] = self._buf[1] = 0xFF
+        mv = memoryview(self._buf)
+        self._views = [mv[:n] for n in range(size+1)]
+
+    def write(self, sid:int, addr:int, data:Sequence[int], ins:int=3) -> memoryview:
+        """WRITE_DATA (ins=3) o REG_WRITE (ins=4)."""
+        n, b = len(data), self._buf
+        if n + 7 > len(b): raise ValueError("packet too long")
+        b[2] = sid; b[3] = n+3; b[4] = ins; b[5] = addr
+        b[6:6+n] = data                                     # mismo largo: no realoja
+        b[6+n] = (~(sid + n+3 + ins + addr + sum(data))) & 0xFF
+        return self._views[7+n]
+
+    def sync_write(self, addr:int, rows:Sequence[Tuple[int,Sequence[int]]]) -> memoryview:
+        n, b = len(rows[0][1]), self._buf
+        size = (n+1)*len(rows)+4
+        if size > 255 or size + 4 > len(b): raise ValueError("SYNC_WRITE too long")
+        b[2] = BROADCAST; b[3] = size; b[4] = 0x83; b[5] = addr; b[6] = n
+        i = 7
+        for sid,data in rows:
+            b[i] = sid; b[i+1:i+1+n] = data; i += n+1
+        b[i] = (~sum(self._views[i][2:])) & 0xFF
+        return self._views[i+1]
+
+
+# ───────────── Status packets ─────────────
+# FF FF | id | largo | error | params | checksum, un Struct por largo de params
+_STATUS_LAYOUTS = [struct.Struct(f"<HBBB{n}sB") for n in range(250)]
+
+class StatusPacket:
+    """Status packet ya validado (sin dict por instancia: el poller crea
+    cientos por segundo)."""
+    __slots__ = ("id", "error", "params")
+
+    def __init__(self, id:int, error:int, params:bytes):
+        self.id, self.error, self.params = id, error, params
+
+    def __repr__(self) -> str:
+        return f"StatusPacket(id={self.id}, error=0x{self.error:02X}, params={self.params!r})"
+
+@lru_cache(maxsize=1024)                    # servo quieto → misma respuesta byte a byte
+def decode_status(resp:bytes) -> Optional[StatusPacket]:
+    """Una respuesta de largo conocido (sin eco ni basura delante) → StatusPacket,
+    o None si la cabecera, el largo o el checksum no cuadran. `resp` tiene que
+    ser bytes (clave de la caché); el StatusPacket devuelto es compartido."""
+    n = len(resp) - 6
+    if not 0 <= n < len(_STATUS_LAYOUTS): return None
+    hdr, sid, length, err, params, cs = _STATUS_LAYOUTS[n].unpack(resp)
+    # checksum sobre todo el paquete sin copiar el tramo: quita FF FF y el propio cs
+    if hdr != 0xFFFF or length != n + 2 or (~(sum(resp) - 0x1FE - cs)) & 0xFF != cs:
+        return None
+    return StatusPacket(sid, err, params)
+
+
+# ───────────── Framer ─────────────
+class StatusFramer:
+    """Parser incremental sobre un bytearray fijo: feed() copia lo recibido,
+    packets() entrega los status packets completos y válidos. Resincroniza
+    en FF FF y descarta basura/eco; el checksum se suma sobre un memoryview
+    (sin listas ni copias por byte)."""
+
+    def __init__(self, size:int=1024):
+        self._buf = bytearray(size)
+        self._mv  = memoryview(self._buf)
+        self._start = self._end = 0
+        self.resyncs = self.bad_checksums = 0
+
+    def __len__(self) -> int: return self._end - self._start
+
+    def clear(self): self._start = self._end = 0
+
+    def feed(self, data:bytes):
+        n = len(data)
+        if self._end + n > len(self._buf):               # compacta al inicio
+            live = self._end - self._start
+            if live + n > len(self._buf):                # no cabe: se pierde lo viejo
+                self.resyncs += 1; self.clear(); live = 0
+                data = data[-len(self._buf):]; n = len(data)
+            else:
+                self._mv[:live] = self._mv[self._start:self._end]
+            self._start, self._end = 0, live
+        self._mv[self._end:self._end+n] = data
+        self._end += n
+
+    def packets(self) -> Iterator[StatusPacket]:
+        buf, mv = self._buf, self._mv
+        while True:
+            i = buf.find(b"\xFF\xFF", self._start, self._end)
+            if i < 0:                                    # conserva un 0xFF suelto al final
+                keep = self._end > self._start and buf[self._end-1] == 0xFF
+                if self._end - self._start > keep: self.resyncs += 1
+                self._start = self._end - keep
+                break
+            if i > self._start: self.resyncs += 1
+            self._start = i
+            if self._end - i < 4: break
+            sid, n = buf[i+2], buf[i+3]
+            if sid == 0xFF or n < 2:                     # FF FF FF… o largo imposible
+                self._start = i + 1; self.resyncs += 1; continue
+            end = i + 4 + n
+            if end > self._end:
+                if end - i > len(buf): self._start = i + 2; continue
+                break
+            if (~sum(mv[i+2:end-1])) & 0xFF != buf[end-1]:
+                self.bad_checksums += 1
+                self._start = i + 2; continue            # busca la siguiente cabecera
+            self._start = end
+            yield StatusPacket(sid, buf[i+4], bytes(mv[i+5:end-1]))
+        if self._start == self._end: self.clear()
+
+def is_echo(st:StatusPacket, pkt:bytes) -> bool:
+    """Eco del propio paquete de instrucción (adaptadores sin control de dirección).
+    Por contenido: un status puede coincidir byte a byte con su instrucción
+    (PING con error 0x01), así que DxlBus solo lo usa hasta saber si el enlace
+    devuelve eco; desde ahí descarta por cantidad de bytes enviados."""
+    return st.id == pkt[2] and st.error == pkt[4] and st.params == pkt[5:-1]
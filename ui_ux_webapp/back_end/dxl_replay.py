@@ -0,0 +1,125 @@
+"""
+dxl_replay.py — Análisis y reproducción de grabaciones del bus (DXL_RECORD_DIR)
+Sin --port resume la grabación: por instrucción, cuántas transacciones,
+cuántas con respuesta y la distribución de latencia TX→primer status.
+Con --port reenvía cada paquete a un puerto real o al emulador respetando
+los tiempos originales (--speed 1), acelerados (--speed 10) o sin esperas
+(--speed 0), y compara las latencias medidas con las grabadas:
+
+    DXL_RECORD_DIR=rec uvicorn app:app            # graba
+    python dxl_replay.py rec/ttyUSB0-20250708-153000.dxlrec
+    python dxl_emulator.py --link /tmp/dxl0 &
+    python dxl_replay.py rec/ttyUSB0-….dxlrec --port /tmp/dxl0 --speed 0
+
+RESET (0x06) nunca se reenvía: devolvería los servos a fábrica.
+────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse, time
+from typing import Dict, List, Tuple
+import numpy as np
+
+from bus_recorder import OK, OUTCOMES, RecordingReader, Transaction
+from dxl_bus import BusUnavailable, DxlBus
+from dxl_protocol import StatusFramer, is_echo
+from metrics import INSTRUCTIONS
+
+WRITES = {0x03, 0x04, 0x05, 0x83}          # WRITE, REG_WRITE, ACTION, SYNC_WRITE
+RESET  = 0x06
+
+Samples = Dict[str, List[float]]             # instrucción → latencias (s)
+
+
+def count_replies(tx:bytes, rx:bytes) -> int:
+    """Status packets válidos en lo grabado, sin contar el eco del propio TX."""
+    fr = StatusFramer(max(64, len(rx)))
+    fr.feed(rx)
+    sts = list(fr.packets())
+    return sum(1 for i, st in enumerate(sts) if not (i == 0 and is_echo(st, tx)))
+
+def ins_name(tx:bytes) -> str:
+    return INSTRUCTIONS.get(tx[4], hex(tx[4])) if len(tx) > 4 else "?"
+
+
+def summarize(title:str, lat:Samples, total:Dict[str, int], outcomes:Dict[str, int]):
+    print(f"\n{title}")
+    print(f"  {'instrucción':12} {'n':>7} {'resp':>7} {'p50 ms':>8} {'p90 ms':>8} "
+          f"{'p99 ms':>8} {'máx ms':>8}")
+    for name in sorted(total):
+        x = np.asarray(lat.get(name, []), dtype=np.float64) * 1e3
+        q = np.percentile(x, (50, 90, 99)) if len(x) else (np.nan,)*3
+        mx = x.max() if len(x) else np.nan
+        print(f"  {name:12} {total[name]:7d} {len(x):7d} {q[0]:8.3f} {q[1]:8.3f} {q[2]:8.3f} {mx:8.3f}")
+    print("  resultados: " + ", ".join(f"{k}={v}" for k, v in sorted(outcomes.items())))
+
+def analyze(txns:List[Transaction]):
+    lat: Samples = {}; total: Dict[str, int] = {}; outcomes: Dict[str, int] = {}
+    for t in txns:
+        name = ins_name(t.tx)
+        total[name] = total.get(name, 0) + 1
+        if t.rx is not None:
+            outcomes[OUTCOMES[t.outcome]] = outcomes.get(OUTCOMES[t.outcome], 0) + 1
+            if t.outcome == OK: lat.setdefault(name, []).append(t.latency)
+        elif t.outcome != OK:
+            outcomes[OUTCOMES[t.outcome]] = outcomes.get(OUTCOMES[t.outcome], 0) + 1
+    return lat, total, outcomes
+
+
+def replay(txns:List[Transaction], port:str, baud:int, speed:float,
+           reads_only:bool, timeout:float) -> Tuple[Samples, Dict[str, int], Dict[str, int]]:
+    bus = DxlBus(port, baud, timeout=timeout)
+    if not bus.start(): raise SystemExit(f"no se pudo abrir {port}")
+    lat: Samples = {}; total: Dict[str, int] = {}; outcomes: Dict[str, int] = {}
+    t0_rec, t0 = txns[0].t_tx, time.monotonic()
+    lag = 0.0
+    try:
+        for t in txns:
+            tx = bytes(t.tx)
+            if len(tx) < 6 or tx[4] == RESET or (reads_only and tx[4] in WRITES): continue
+            if speed > 0:                                    # tiempos originales / speed
+                wait = t0 + (t.t_tx - t0_rec)/speed - time.monotonic()
+                if wait > 0: time.sleep(wait)
+                else: lag = max(lag, -wait)
+            name = ins_name(tx)
+            total[name] = total.get(name, 0) + 1
+            try:
+                if t.rx is None:
+                    bus.transact(tx); continue
+                replies = max(1, count_replies(tx, bytes(t.rx)))
+                sts = bus.exchange(tx, replies, max(6, len(t.rx)), timeout * replies)
+            except BusUnavailable as e:
+                outcomes["io_error"] = outcomes.get("io_error", 0) + 1
+                print(f"  E/S: {e}"); continue
+            res = "ok" if len(sts) >= replies else "partial" if sts else "timeout"
+            outcomes[res] = outcomes.get(res, 0) + 1
+            if res == "ok" and bus.last_rtt is not None: lat.setdefault(name, []).append(bus.last_rtt)
+    finally:
+        bus.close()
+    if lag > 0.001: print(f"\n  atraso máximo respecto del ritmo pedido: {lag*1e3:.1f} ms")
+    return lat, total, outcomes
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Resume o reproduce una grabación del bus Dynamixel")
+    ap.add_argument("recording")
+    ap.add_argument("--port", default=None, help="puerto o pty del emulador donde reproducir")
+    ap.add_argument("--baud", type=int, default=None, help="por defecto, el de la grabación")
+    ap.add_argument("--speed", type=float, default=1.0, help="1 = tiempo real, 0 = sin esperas")
+    ap.add_argument("--reads-only", action="store_true", help="no reenvía escrituras")
+    ap.add_argument("--timeout", type=float, default=0.02)
+    a = ap.parse_args()
+
+    with RecordingReader(a.recording) as rec:
+        txns = list(rec.transactions())
+        if not txns: raise SystemExit("grabación vacía")
+        span = txns[-1].t_tx - txns[0].t_tx
+        print(f"{rec.port} @ {rec.baud} — {len(txns)} transacciones en {span:.1f} s, desde "
+              f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(rec.wall_time(txns[0].t_tx)))}")
+        summarize("grabado", *analyze(txns))
+        if a.port:
+            summarize(f"reproducido en {a.port} (×{a.speed:g})",
+                      *replay(txns, a.port, a.baud or rec.baud, a.speed, a.reads_only, a.timeout))
+        del txns                                # suelta las vistas del mmap antes de cerrar
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+history.py — Historial de telemetría en anillos columnares sobre memmap
+Por servo: un anillo de timestamps (float64) y una columna int16 por campo
+con el valor crudo (-1 = sin dato). Memoria fija (capacidad × campos) y
+persistido en archivos .npy mapeados, así que sobrevive a reinicios sin
+base de datos. query() reduce un rango de tiempo a `points` cubetas con
+min/max/media ya en unidades físicas, para graficar horas con poco JSON.
+────────────────────────────────────────────────────────────────────────
+"""
+
+import json, logging, os, threading, time
+from typing import Callable, Dict, Optional, Sequence
+import numpy as np
+
+log = logging.getLogger("dxl.history")
+
+MISSING = -1                # crudo imposible en los registros de la tabla
+
+def _signed(raw:np.ndarray, scale:float) -> np.ndarray:
+    """Bit 10 = sentido (CW) en Present Speed / Present Load."""
+    return np.where(raw >= 1024, -(raw - 1024), raw) * scale
+
+# crudo → unidad física (mismas conversiones que format_inspect)
+PHYSICAL: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "PRESENT_POSITION": lambda r: r * 300/1023,              # °
+    "PRESENT_SPEED":    lambda r: _signed(r, 0.111),         # rpm
+    "PRESENT_LOAD":     lambda r: _signed(r, 100/1023),      # %
+    "PRESENT_VOLTAGE":  lambda r: r / 10,                    # V
+}
+
+
+class HistoryStore:
+    def __init__(self, path:str, ids:Sequence[int], fields:Sequence[str],
+                 capacity:int=144_000):
+        self.path, self.ids, self.fields = path, list(ids), list(fields)
+        self.capacity = capacity
+        self._row = {sid:i for i,sid in enumerate(self.ids)}
+        self._col = {f:j for j,f in enumerate(self.fields)}
+        self._lock = threading.Lock()       # append (event loop) vs query (hilo)
+        self._open()
+
+    # ---------- archivos ----------
+    def _open(self):
+        os.makedirs(self.path, exist_ok=True)
+        meta = {"ids":self.ids, "fields":self.fields, "capacity":self.capacity}
+        mpath = os.path.join(self.path, "meta.json")
+        try:
+            with open(mpath) as f: same = json.load(f) == meta
+        except (OSError, ValueError):
+            same = False
+        mode = "r+" if same else "w+"
+        if not same: log.info("historial nuevo en %s (%s)", self.path, meta)
+        S, F, C = len(self.ids), len(self.fields), self.capacity
+        mm = lambda name, dtype, shape: np.lib.format.open_memmap(
+            os.path.join(self.path, name), mode=mode, dtype=dtype, shape=shape)
+        self.ts   = mm("ts.npy", np.float64, (S, C))
+        self.val  = mm("values.npy", np.int16, (S, F, C))
+        self.head = mm("head.npy", np.int64, (S, 2))        # (próxima posición, cantidad)
+        if not same:
+            self.val[:] = MISSING
+            with open(mpath, "w") as f: json.dump(meta, f)
+
+    def flush(self):
+        for a in (self.ts, self.val, self.head): a.flush()
+
+    # ---------- escritura ----------
+    def append(self, sid:int, values:Dict[str, Optional[int]], ts:Optional[float]=None):
+        """Una muestra por servo; los campos sin dato quedan en MISSING. El
+        timestamp nunca retrocede (NTP puede mover time.time() hacia atrás) para
+        que el anillo siga ordenado y query() pueda usar searchsorted."""
+        i = self._row.get(sid)
+        if i is None: return
+        t = time.time() if ts is None else ts
+        with self._lock:
+            pos, n = (int(x) for x in self.head[i])
+            if n: t = max(t, float(self.ts[i, (pos - 1) % self.capacity]))
+            col = self.val[i, :, pos]
+            col[:] = MISSING
+            for k,v in values.items():
+                j = self._col.get(k)
+                if j is not None and v is not None: col[j] = v
+            self.ts[i, pos] = t
+            self.head[i] = ((pos + 1) % self.capacity, min(n + 1, self.capacity))
+
+    # ---------- lectura ----------
+    def _ordered(self, i:int):
+        """Índices del anillo en orden cronológico (del más viejo al más nuevo)."""
+        pos, n = (int(x) for x in self.head[i])
+        return (np.arange(pos - n, pos) % self.capacity) if n else np.empty(0, dtype=np.int64)
+
+    def query(self, sid:int, fields:Sequence[str], start:float, end:float,
+              points:int=300) -> Dict[str, object]:
+        """[start, end] en `points` cubetas de igual duración. Solo se
+        devuelven las cubetas con datos: t (centro), n y min/max/mean por campo."""
+        i = self._row[sid]
+        with self._lock:                    # copia coherente: head, ts y valores a la vez
+            idx = self._ordered(i)
+            ts  = self.ts[i, idx]
+            lo, hi = np.searchsorted(ts, start, "left"), np.searchsorted(ts, end, "right")
+            idx, ts = idx[lo:hi], ts[lo:hi]
+            cols = {f:self.val[i, self._col[f], idx] for f in fields}
+        out: Dict[str, object] = {"id":sid, "start":start, "end":end, "samples":int(len(ts))}
+        if not len(ts):
+            out.update(t=[], n=[], fields={f:{"min":[], "max":[], "mean":[]} for f in fields})
+            return out
+
+        width  = (end - start) / points
+        bucket = np.minimum(((ts - start) / width).astype(np.int64), points - 1)
+        first  = np.flatnonzero(np.diff(bucket, prepend=-1))    # inicio de cada cubeta no vacía
+        counts = np.diff(np.append(first, len(ts)))
+        out["t"] = np.round(start + (bucket[first] + 0.5) * width, 3).tolist()
+        out["n"] = counts.tolist()
+
+        res: Dict[str, Dict[str, list]] = {}
+        for f in fields:
+            raw = cols[f].astype(np.float64)
+            ok  = raw != MISSING
+            x   = np.where(ok, PHYSICAL.get(f, lambda r: r)(raw), np.nan)
+            cnt = np.add.reduceat(ok, first)
+            with np.errstate(invalid="ignore"):
+                mean = np.add.reduceat(np.nan_to_num(x), first) / cnt
+            rnd = lambda a: [None if v != v else v for v in np.round(a, 3).tolist()]   # NaN → None
+            res[f] = {"min":rnd(np.fmin.reduceat(x, first)),
+                      "max":rnd(np.fmax.reduceat(x, first)),
+                      "mean":rnd(mean)}
+        out["fields"] = res
+        return out
+
+    def stats(self) -> Dict[str, object]:
+        return {"path":self.path, "capacity":self.capacity, "fields":self.fields,
+                "bytes":int(self.ts.nbytes + self.val.nbytes),
+                "samples":{sid:int(self.head[i, 1]) for sid,i in self._row.items()}}
@@ -0,0 +1,41 @@
+"""
+inventory.py — Inventario de buses generado por dxl_scanner.py
+(basic_br_control/python_scripts/ft232rl). Con DXL_INVENTORY=<json> el
+backend toma de ahí puerto, baudios, IDs a barrer y modelos, en vez de
+los valores fijos de app.py.
+────────────────────────────────────────────────────────────────────────
+"""
+
+import json, logging
+from typing import Dict, List, NamedTuple
+
+log = logging.getLogger("dxl.inventory")
+
+MX_PREFIX = "MX-"           # modelos con BULK_READ (0x92)
+
+
+class InventoryBus(NamedTuple):
+    port:str
+    baud:int
+    servos:Dict[int, str]   # id → nombre de modelo
+
+    @property
+    def all_mx(self) -> bool:
+        return bool(self.servos) and all(m.startswith(MX_PREFIX) for m in self.servos.values())
+
+
+def load_inventory(path:str) -> List[InventoryBus]:
+    """JSON del escáner → un InventoryBus por (puerto, baudios) con servos.
+    Sin ruta devuelve []; un archivo roto se registra y también da []."""
+    if not path: return []
+    try:
+        with open(path) as f: doc = json.load(f)
+        buses = [InventoryBus(p["port"], int(b["baud"]),
+                              {int(s["id"]): s.get("model_name") or "unknown" for s in b["servos"]})
+                 for p in doc["ports"] for b in p.get("buses", []) if b.get("servos")]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        log.error("inventario %s ilegible: %s", path, e)
+        return []
+    log.info("inventario %s: %s", path,
+             ", ".join(f"{b.port}@{b.baud} ids={sorted(b.servos)}" for b in buses) or "vacío")
+    return buses
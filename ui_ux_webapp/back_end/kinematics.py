@@ -0,0 +1,123 @@
+"""
+kinematics.py — Cinemática directa/inversa del brazo de 4 GDL
+Base (yaw) + hombro + codo (pitch) posicionan la punta; la junta 4 es el
+gripper y solo aporta el último eslabón fijo de la tabla DH. Todo es
+vectorizado con NumPy (N poses por llamada) y trabaja en grados de servo
+(0–300°), con los mismos DIR/OFFSET que RobotArmVisualization.tsx.
+Medidas tomadas del modelo 3D (1 u = 50 mm): ajustar al brazo real.
+────────────────────────────────────────────────────────────────────────
+"""
+
+from functools import lru_cache
+from typing import Optional, Tuple
+import numpy as np
+
+# ───────────── Geometría (mm) ─────────────
+L0 = 30.0             # base → eje del hombro
+L1 = 120.0            # hombro → codo
+L2 = 100.0            # codo → muñeca/gripper
+LT = 35.0             # gripper → punta (TCP)
+
+# servo (°) → junta: q = DIR·(deg − 150 − OFFSET)
+DIR    = np.array([1, -1, -1, -1], dtype=float)
+OFFSET = np.array([20, -86, 5, 0], dtype=float)
+LIMITS = (0.0, 300.0)                                     # mismo rango que /api/move
+
+# DH estándar: (a, alpha, d, theta0) por junta; theta = q + theta0
+DH = np.array([
+    [0.0, np.pi/2, L0, 0.0],          # 1 base (yaw)
+    [L1,  0.0,     0.0, np.pi/2],     # 2 hombro (q=0 → brazo vertical)
+    [L2,  0.0,     0.0, 0.0],         # 3 codo
+    [LT,  0.0,     0.0, 0.0],         # 4 gripper (no mueve la punta)
+])
+
+IK_QUANTUM = 0.5      # mm, resolución de la clave de la caché de IK
+REACH      = L0 + L1 + L2 + LT    # mm, cota de |x|,|y|,|z| alcanzable
+
+
+def servo_to_joint(deg:np.ndarray) -> np.ndarray:
+    """(N,k) grados de servo → (N,k) radianes de junta."""
+    k = deg.shape[-1]
+    return np.radians(DIR[:k] * (deg - 150.0 - OFFSET[:k]))
+
+def joint_to_servo(q:np.ndarray) -> np.ndarray:
+    k = q.shape[-1]
+    return DIR[:k] * np.degrees(q) + 150.0 + OFFSET[:k]
+
+
+# ───────────── Directa ─────────────
+def fk_frames(deg:np.ndarray) -> np.ndarray:
+    """(N,3|4) grados → (N,4,3) origen de cada marco DH (codo, muñeca…, punta)."""
+    deg = np.atleast_2d(np.asarray(deg, dtype=float))
+    q   = np.zeros((len(deg), 4)); q[:, :3] = servo_to_joint(deg[:, :3])
+    a, alpha, d, th0 = DH.T
+    th  = q + th0
+    ct, st, ca, sa = np.cos(th), np.sin(th), np.cos(alpha), np.sin(alpha)
+    A = np.zeros((len(deg), 4, 4, 4))                     # N × junta × 4 × 4
+    A[..., 0, 0], A[..., 0, 1], A[..., 0, 2], A[..., 0, 3] = ct, -st*ca,  st*sa, a*ct
+    A[..., 1, 0], A[..., 1, 1], A[..., 1, 2], A[..., 1, 3] = st,  ct*ca, -ct*sa, a*st
+    A[..., 2, 1], A[..., 2, 2], A[..., 2, 3] = sa, ca, d
+    A[..., 3, 3] = 1.0
+    T, out = np.broadcast_to(np.eye(4), (len(deg), 4, 4)), np.empty((len(deg), 4, 3))
+    for j in range(4):
+        T = T @ A[:, j]
+        out[:, j] = T[:, :3, 3]
+    return out
+
+def fk(deg:np.ndarray) -> np.ndarray:
+    """(N,3|4) grados de servo → (N,3) posición de la punta (mm)."""
+    return fk_frames(deg)[:, -1]
+
+
+# ───────────── Inversa ─────────────
+def ik(xyz:np.ndarray, elbow_up:bool=True,
+       ref:Optional[np.ndarray]=None) -> Tuple[np.ndarray, np.ndarray]:
+    """(N,3) mm → ((N,3) grados de servo, (N,) alcanzable y dentro de límites).
+    Evalúa las 4 ramas (base ±π, codo ±) a la vez y elige, entre las válidas,
+    la más cercana a `ref` (grados) o la preferencia de codo si no hay ref."""
+    xyz = np.atleast_2d(np.asarray(xyz, dtype=float))
+    x, y, z = xyz.T
+    l2 = L2 + LT                                          # antebrazo + gripper alineados
+    r  = np.hypot(x, y)
+    zp = z - L0
+    D  = (r**2 + zp**2 - L1**2 - l2**2) / (2*L1*l2)
+    reach = np.abs(D) <= 1.0
+    c3 = np.clip(D, -1.0, 1.0)
+
+    cand = []
+    for flip in (False, True):                            # base mirando al objetivo o de espaldas
+        th1 = np.arctan2(y, x) + (np.pi if flip else 0.0)
+        rr  = -r if flip else r
+        for up in (True, False):
+            th3 = np.arccos(c3) * (-1 if up else 1)
+            th2 = np.arctan2(zp, rr) - np.arctan2(l2*np.sin(th3), L1 + l2*np.cos(th3))
+            cand.append(joint_to_servo(np.stack([th1, th2 - np.pi/2, th3], axis=1)))
+    cand = np.stack(cand, axis=1) % 360.0                 # N × 4 ramas × 3, mismo ángulo en [0,360)
+    ok   = np.all((cand >= LIMITS[0]) & (cand <= LIMITS[1]), axis=2) & reach[:, None]
+
+    if ref is not None:
+        ref  = np.broadcast_to(np.asarray(ref, dtype=float)[..., :3], (len(xyz), 3))
+        cost = np.abs(cand - ref[:, None]).sum(axis=2)
+    else:
+        order = np.array([0, 1, 2, 3] if elbow_up else [1, 0, 3, 2], dtype=float)
+        cost  = np.broadcast_to(order, ok.shape)
+    cost  = np.where(ok, cost, np.inf)
+    best  = cost.argmin(axis=1)
+    sol   = cand[np.arange(len(xyz)), best]
+    return sol, ok[np.arange(len(xyz)), best]
+
+
+@lru_cache(maxsize=1024)
+def _ik_cached(key:Tuple[int, int, int], elbow_up:bool) -> Optional[Tuple[float, float, float]]:
+    sol, ok = ik(np.array(key, dtype=float) * IK_QUANTUM, elbow_up)
+    return tuple(sol[0].tolist()) if ok[0] else None
+
+def ik_one(x:float, y:float, z:float,
+           elbow_up:bool=True) -> Optional[Tuple[float, float, float]]:
+    """IK de un solo objetivo con caché LRU (objetivos cuantizados a IK_QUANTUM mm).
+    None si no hay solución, también para NaN/inf o coordenadas absurdas."""
+    if not all(abs(c) <= REACH for c in (x, y, z)): return None   # NaN compara False
+    key = (round(x/IK_QUANTUM), round(y/IK_QUANTUM), round(z/IK_QUANTUM))
+    return _ik_cached(key, elbow_up)
+
+ik_cache_info = _ik_cached.cache_info
@@ -0,0 +1,182 @@
+"""
+metrics.py — Métricas en formato de texto Prometheus (sin dependencias)
+Contadores e histogramas con buckets fijos: observar es un bisect y dos
+sumas (~1 µs), sin locks. Se actualizan desde los hilos de E/S y el event
+loop; bajo carrera puede perderse algún incremento suelto, aceptable para
+métricas. render() arma la exposición completa para /metrics.
+────────────────────────────────────────────────────────────────────────
+"""
+
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+SERIAL_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.02, 0.05, 0.1)
+HTTP_BUCKETS   = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+INSTRUCTIONS = {0x01:"ping", 0x02:"read", 0x03:"write", 0x04:"reg_write", 0x05:"action",
+                0x06:"reset", 0x83:"sync_write", 0x92:"bulk_read"}
+
+Labels = Tuple[str, ...]
+
+
+def _fmt_labels(names:Sequence[str], values:Labels, extra:str="") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra: parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v:float) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+    def __init__(self, bounds:Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v:float):
+        self.counts[bisect_left(self.bounds, v)] += 1
+        self.sum += v
+        self.count += 1
+
+
+class _Counter:
+    __slots__ = ("value",)
+    def __init__(self): self.value = 0.0
+    def inc(self, v:float=1.0): self.value += v
+
+
+class _Family:
+    kind = ""
+    def __init__(self, name:str, doc:str, labels:Sequence[str]=()):
+        self.name, self.doc, self.labelnames = name, doc, tuple(labels)
+        self._children: Dict[Labels, object] = {}
+
+    def labels(self, *values:object):
+        key = tuple(str(v) for v in values)
+        c = self._children.get(key)
+        if c is None: c = self._children[key] = self._new()
+        return c
+
+    def _new(self): raise NotImplementedError
+    def _samples(self) -> Iterable[str]: raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}",
+                *self._samples()]
+
+
+class Histogram(_Family):
+    kind = "histogram"
+    def __init__(self, name:str, doc:str, labels:Sequence[str]=(),
+                 buckets:Sequence[float]=SERIAL_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, doc, labels)
+
+    def _new(self): return _Histogram(self.buckets)
+
+    def _samples(self):
+        les = ['le="%s"' % b for b in self.buckets] + ['le="+Inf"']
+        for key, h in list(self._children.items()):
+            acc, names = 0, self.labelnames
+            for le, c in zip(les, h.counts):
+                acc += c
+                yield f"{self.name}_bucket{_fmt_labels(names, key, le)} {acc}"
+            yield f"{self.name}_sum{_fmt_labels(names, key)} {_num(h.sum)}"
+            yield f"{self.name}_count{_fmt_labels(names, key)} {h.count}"
+
+
+class Counter(_Family):
+    kind = "counter"
+    def _new(self): return _Counter()
+    def _samples(self):
+        for key, c in list(self._children.items()):
+            yield f"{self.name}{_fmt_labels(self.labelnames, key)} {_num(c.value)}"
+
+
+class Gauge(_Family):
+    """Valor calculado en el momento del scrape: fn() → {labels: valor}."""
+    kind = "gauge"
+    def __init__(self, name:str, doc:str, labels:Sequence[str],
+                 fn:Callable[[], Dict[Labels, float]]):
+        super().__init__(name, doc, labels)
+        self.fn = fn
+    def _samples(self):
+        for key, v in self.fn().items():
+            yield f"{self.name}{_fmt_labels(self.labelnames, key)} {_num(v)}"
+
+
+class Registry:
+    def __init__(self): self.families: List[_Family] = []
+
+    def add(self, fam:_Family) -> _Family:
+        self.families.append(fam); return fam
+
+    def render(self) -> str:
+        return "\n".join(line for f in self.families for line in f.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+# ───────────── Bus serie ─────────────
+DXL_TXN = REGISTRY.add(Histogram("dxl_transaction_seconds",
+    "TX+RX time per instruction packet, lock held", ("port", "instruction")))
+DXL_SERVO = REGISTRY.add(Histogram("dxl_servo_read_seconds",
+    "READ_DATA round trip per servo (valid replies only)", ("sid",)))
+DXL_LOCK_WAIT = REGISTRY.add(Histogram("dxl_lock_wait_seconds",
+    "Time from the request (job enqueued) until the bus lock is taken", ("port",)))
+DXL_LOCK_HOLD = REGISTRY.add(Histogram("dxl_lock_hold_seconds",
+    "Time holding the bus lock", ("port",)))
+DXL_QUEUE_WAIT = REGISTRY.add(Histogram("dxl_queue_wait_seconds",
+    "Time a job waits in the bus queue before it starts", ("port", "priority")))
+DXL_TIMEOUTS = REGISTRY.add(Counter("dxl_timeouts_total",
+    "Reads without a valid status packet", ("sid",)))
+DXL_BAD_CHECKSUM = REGISTRY.add(Counter("dxl_checksum_errors_total",
+    "Status packets dropped for a bad checksum", ("port",)))
+DXL_WIRE = REGISTRY.add(Counter("dxl_wire_seconds_total",
+    "Wire time of bytes sent and received (10 bits per byte at the bus baud)", ("port",)))
+DXL_BYTES = REGISTRY.add(Counter("dxl_bytes_total",
+    "Bytes on the bus", ("port", "direction")))
+
+# ───────────── HTTP ─────────────
+HTTP_LATENCY = REGISTRY.add(Histogram("http_request_seconds",
+    "FastAPI handler latency", ("method", "route", "status"), HTTP_BUCKETS))
+
+
+class BusMetrics:
+    """Hijos ya resueltos de un puerto: en la ruta caliente no se arman labels."""
+    def __init__(self, port:str, baud:int):
+        self.port, self.byte_s = port, 10.0 / baud          # 8N1 → 10 bits por byte
+        self.wait, self.hold = DXL_LOCK_WAIT.labels(port), DXL_LOCK_HOLD.labels(port)
+        self.wire, self.bad  = DXL_WIRE.labels(port), DXL_BAD_CHECKSUM.labels(port)
+        self.tx, self.rx     = DXL_BYTES.labels(port, "tx"), DXL_BYTES.labels(port, "rx")
+        self._txn: Dict[int, _Histogram] = {}
+        self._rtt: Dict[int, _Histogram] = {}
+        self._tmo: Dict[int, _Counter] = {}
+
+    def txn(self, ins:int, t_req:float, t_acq:float, t_io:float, t_end:float,
+            ntx:int, nrx:int, bad:int=0):
+        """Una transacción: espera del lock, lock tomado, E/S y bytes en el cable
+        (el eco del half-duplex cuenta como RX: también ocupa la línea)."""
+        h = self._txn.get(ins)
+        if h is None:
+            h = self._txn[ins] = DXL_TXN.labels(self.port, INSTRUCTIONS.get(ins, hex(ins)))
+        h.observe(t_end - t_io)
+        self.wait.observe(t_acq - t_req)
+        self.hold.observe(t_end - t_acq)
+        self.tx.inc(ntx); self.rx.inc(nrx)
+        self.wire.inc((ntx + nrx) * self.byte_s)
+        if bad: self.bad.inc(bad)
+
+    def servo_ok(self, sid:int, rtt:Optional[float]):
+        if rtt is None: return
+        h = self._rtt.get(sid)
+        if h is None: h = self._rtt[sid] = DXL_SERVO.labels(sid)
+        h.observe(rtt)
+
+    def servo_timeout(self, sid:int):
+        c = self._tmo.get(sid)
+        if c is None: c = self._tmo[sid] = DXL_TIMEOUTS.labels(sid)
+        c.inc()
@@ -0,0 +1,158 @@
+"""
+servo_health.py — Salud por servo, timeouts adaptativos y circuit breaker
+Cada READ deja su RTT (o timeout / checksum malo) en el ServoHealth del ID.
+El timeout de la siguiente lectura sale del RTT medido (srtt + 4·rttvar,
+como TCP) con piso en el tiempo de cable + Return Delay Time, y tope en
+el TIMEOUT fijo. Tras varios timeouts seguidos el ID queda "abierto": las
+lecturas vuelven al instante con None y una tarea de fondo le manda un PING
+barato, con backoff, hasta que vuelve a contestar.
+────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio, logging, time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+log = logging.getLogger("dxl.health")
+
+RTT_ALPHA  = 0.125          # ganancias de srtt/rttvar (RFC 6298)
+RTT_BETA   = 0.25
+RATE_ALPHA = 0.05           # EWMA de las tasas de timeout / checksum
+MARGIN     = 0.002          # s, latencia USB mínima por encima del cable
+
+
+class ServoHealth:
+    __slots__ = ("sid", "srtt", "rttvar", "rdt_s", "ok", "timeouts", "bad_checksums",
+                 "timeout_rate", "checksum_rate", "fails", "open", "next_probe",
+                 "probe_backoff", "last_ok")
+
+    def __init__(self, sid:int):
+        self.sid = sid
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.rdt_s: Optional[float] = None          # Return Delay Time leído del servo
+        self.ok = self.timeouts = self.bad_checksums = 0
+        self.timeout_rate = self.checksum_rate = 0.0
+        self.fails = 0                              # timeouts consecutivos
+        self.open = False
+        self.next_probe = 0.0
+        self.probe_backoff = 0.0
+        self.last_ok = 0.0
+
+    def snapshot(self) -> Dict[str, object]:
+        ms = lambda v: None if v is None else round(v*1e3, 3)
+        return {"state":"open" if self.open else "closed",
+                "rtt_ms":ms(self.srtt), "rttvar_ms":ms(self.rttvar),
+                "return_delay_us":None if self.rdt_s is None else round(self.rdt_s*1e6),
+                "ok":self.ok, "timeouts":self.timeouts, "bad_checksums":self.bad_checksums,
+                "timeout_rate":round(self.timeout_rate, 4),
+                "checksum_rate":round(self.checksum_rate, 4),
+                "consecutive_timeouts":self.fails,
+                "last_ok_age_s":round(time.monotonic()-self.last_ok, 3) if self.last_ok else None}
+
+
+class HealthMonitor:
+    """Se actualiza desde el hilo de E/S y se lee desde el event loop: solo
+    asignaciones de escalares, sin estructuras compartidas que se recorran."""
+
+    def __init__(self, base_timeout:float=0.02, baud:int=1_000_000,
+                 min_timeout:float=0.003, trip_after:int=3,
+                 probe_min:float=1.0, probe_max:float=30.0):
+        self.base_timeout, self.baud, self.min_timeout = base_timeout, baud, min_timeout
+        self.trip_after = trip_after
+        self.probe_min, self.probe_max = probe_min, probe_max
+        self.servos: Dict[int, ServoHealth] = {}
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.probes = 0
+
+    def __getitem__(self, sid:int) -> ServoHealth:
+        h = self.servos.get(sid)
+        if h is None: h = self.servos[sid] = ServoHealth(sid)
+        return h
+
+    # ---------- decisiones ----------
+    def allow(self, sid:int) -> bool:
+        h = self.servos.get(sid)
+        return h is None or not h.open
+
+    def timeout_for(self, sid:int, nbytes:int) -> float:
+        """Timeout de una transacción con `sid` que mueve `nbytes` por el cable."""
+        h = self.servos.get(sid)
+        if h is None or h.srtt is None: return self.base_timeout
+        floor = nbytes * 10 / self.baud + (h.rdt_s or 0.0) + MARGIN
+        return min(self.base_timeout, max(self.min_timeout, floor, h.srtt + 4*h.rttvar))
+
+    # ---------- registro ----------
+    def record(self, sid:int, rtt:Optional[float], bad_checksums:int=0):
+        """rtt = None → timeout (sin status packet válido)."""
+        h, now = self[sid], time.monotonic()
+        if bad_checksums:
+            h.bad_checksums += bad_checksums
+        h.checksum_rate += RATE_ALPHA * ((1.0 if bad_checksums else 0.0) - h.checksum_rate)
+        h.timeout_rate  += RATE_ALPHA * ((1.0 if rtt is None else 0.0) - h.timeout_rate)
+        if rtt is None:
+            h.timeouts += 1; h.fails += 1
+            if not h.open and h.fails >= self.trip_after:
+                h.open, h.probe_backoff = True, self.probe_min
+                h.next_probe = now + h.probe_backoff
+                log.warning("servo %d sin respuesta %d veces: circuito abierto", sid, h.fails)
+            return
+        h.ok += 1; h.fails = 0; h.last_ok = now
+        if h.srtt is None: h.srtt, h.rttvar = rtt, rtt/2
+        else:
+            h.rttvar += RTT_BETA  * (abs(h.srtt - rtt) - h.rttvar)
+            h.srtt   += RTT_ALPHA * (rtt - h.srtt)
+        if h.open:
+            h.open = False
+            log.info("servo %d responde de nuevo: circuito cerrado", sid)
+
+    def set_return_delay(self, sid:int, raw:int):
+        self[sid].rdt_s = raw * 2e-6
+
+    # ---------- sondeo en segundo plano ----------
+    def start(self, ping:Callable[[int], Awaitable[bool]],
+              read_rdt:Callable[[int], Awaitable[Optional[int]]], period:float=0.5):
+        if self._task: return
+        self._task = asyncio.get_running_loop().create_task(
+            self._run(ping, read_rdt, period), name="dxl-health")
+
+    async def stop(self):
+        if self._task is None: return
+        self._task.cancel()
+        try:    await self._task
+        except asyncio.CancelledError: pass
+        self._task = None
+
+    async def _run(self, ping, read_rdt, period:float):
+        from dxl_bus import BusUnavailable      # aquí: dxl_bus importa este módulo
+        bus_down = False
+        while True:
+            await asyncio.sleep(period)
+            touched = False                         # ¿la ronda llegó al bus?
+            try:
+                for h in list(self.servos.values()):
+                    if h.open and time.monotonic() >= h.next_probe:
+                        self.probes += 1; touched = True
+                        if not await ping(h.sid):
+                            h.probe_backoff = min(self.probe_max, h.probe_backoff*2)
+                            h.next_probe = time.monotonic() + h.probe_backoff
+                    elif not h.open and h.rdt_s is None and h.ok:
+                        touched = True
+                        raw = await read_rdt(h.sid)
+                        if raw is not None: self.set_return_delay(h.sid, raw)
+            except BusUnavailable as e:             # desenchufado: se saltea la ronda, sin traza
+                if not bus_down: log.warning("sondeo de salud en pausa, sin bus: %s", e)
+                bus_down = True
+                continue
+            except Exception:
+                log.exception("error en el sondeo de salud")
+            if bus_down and touched:
+                log.info("bus de vuelta: se reanuda el sondeo de salud")
+                bus_down = False
+
+    def open_ids(self) -> List[int]:
+        return sorted(sid for sid,h in self.servos.items() if h.open)
+
+    def stats(self) -> Dict[str, object]:
+        return {"base_timeout_ms":self.base_timeout*1e3, "trip_after":self.trip_after,
+                "probes":self.probes, "open":self.open_ids(),
+                "servos":{sid:h.snapshot() for sid,h in sorted(self.servos.items())}}
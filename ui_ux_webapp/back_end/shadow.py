@@ -0,0 +1,96 @@
+"""
+shadow.py — Copia en memoria de la tabla de control de cada servo
+Todo lo que se lee o se escribe por el bus queda en la sombra con su
+timestamp. La EEPROM (< 24) vale hasta que se invalide; en la RAM cada
+campo tiene su TTL y los que cambian solos (PRESENT_*, MOVING…) no se
+sirven nunca desde aquí. Una escritura que coincide con lo que la sombra
+sabe (y sigue vigente) no hace falta mandarla.
+────────────────────────────────────────────────────────────────────────
+"""
+
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from control_table import REGS
+
+TABLE_LEN  = 50
+EEPROM_END = 24
+FOREVER    = float("inf")
+
+# TTL (s) de los campos RAM cacheables. TORQUE_ENABLE / TORQUE_LIMIT los
+# cambia el propio servo en un alarm shutdown, por eso duran poco.
+RAM_TTL: Dict[str, float] = {
+    "TORQUE_ENABLE": 1.0,  "LED":           5.0,
+    "CW_MARGIN":    30.0,  "CCW_MARGIN":   30.0,
+    "CW_SLOPE":     30.0,  "CCW_SLOPE":    30.0,
+    "GOAL_POSITION": 1.0,  "MOVING_SPEED":  5.0,
+    "TORQUE_LIMIT":  1.0,  "LOCK":         30.0,
+    "PUNCH":        30.0,
+}
+
+def _ttl_by_addr() -> List[float]:
+    ttl = [FOREVER]*EEPROM_END + [0.0]*(TABLE_LEN - EEPROM_END)
+    for name, t in RAM_TTL.items():
+        addr, size = REGS[name]
+        ttl[addr:addr+size] = [t]*size
+    return ttl
+
+TTL = _ttl_by_addr()
+
+
+class _Servo:
+    __slots__ = ("table", "stamp")
+    def __init__(self):
+        self.table = bytearray(TABLE_LEN)
+        self.stamp = array("d", bytes(8*TABLE_LEN))    # 0.0 = desconocido
+
+
+class ControlTableShadow:
+    def __init__(self):
+        self._s: Dict[int, _Servo] = {}
+        self.hits = self.suppressed = self.writes = 0
+
+    def ids(self) -> List[int]: return list(self._s)
+
+    # ---------- consulta ----------
+    def fresh(self, sid:int, addr:int, n:int, now:Optional[float]=None) -> bool:
+        s = self._s.get(sid)
+        if s is None or addr + n > TABLE_LEN: return False
+        now = time.monotonic() if now is None else now
+        return all(s.stamp[a] and now - s.stamp[a] <= TTL[a] for a in range(addr, addr+n))
+
+    def get_fields(self, sid:int, fields:Iterable[str]) -> Dict[str, int]:
+        """Campos vigentes en la sombra (los demás hay que leerlos del bus)."""
+        s, now, out = self._s.get(sid), time.monotonic(), {}
+        if s is None: return out
+        for f in fields:
+            addr, size = REGS[f]
+            if self.fresh(sid, addr, size, now):
+                out[f] = int.from_bytes(s.table[addr:addr+size], "little")
+        self.hits += len(out)
+        return out
+
+    def matches(self, sid:int, addr:int, data:Sequence[int]) -> bool:
+        """True si escribir `data` en `addr` no cambiaría nada conocido."""
+        s = self._s.get(sid)
+        return (s is not None and self.fresh(sid, addr, len(data))
+                and s.table[addr:addr+len(data)] == bytes(data))
+
+    # ---------- actualización ----------
+    def store(self, sid:int, addr:int, data:Sequence[int], now:Optional[float]=None):
+        if addr + len(data) > TABLE_LEN: return
+        s = self._s.get(sid)
+        if s is None: s = self._s[sid] = _Servo()
+        now = time.monotonic() if now is None else now
+        s.table[addr:addr+len(data)] = bytes(data)
+        for a in range(addr, addr+len(data)): s.stamp[a] = now
+
+    def invalidate(self, sid:Optional[int]=None, addr:int=0, n:int=TABLE_LEN):
+        """Olvida [addr, addr+n) de `sid` (o de todos con sid=None)."""
+        for s in (self._s.values() if sid is None else filter(None, [self._s.get(sid)])):
+            for a in range(addr, min(addr+n, TABLE_LEN)): s.stamp[a] = 0.0
+
+    def stats(self) -> Dict[str, object]:
+        return {"servos":sorted(self._s), "field_hits":self.hits,
+                "writes":self.writes, "writes_suppressed":self.suppressed}
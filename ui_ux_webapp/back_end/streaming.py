@@ -0,0 +1,87 @@
+"""
+streaming.py — Telemetría en streaming (WebSocket + SSE)
+Cada cliente se suscribe a unos IDs/campos y recibe solo lo que cambió
+desde su último frame (delta), a lo sumo a `rate` Hz. Los frames se
+generan justo antes de enviar a partir de la foto del poller: un cliente
+lento se salta versiones intermedias en vez de acumular cola.
+────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio, json, math, time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from telemetry import TelemetryPoller, Reading
+
+MAX_RATE  = 50.0            # Hz
+KEYFRAME  = 5.0             # s entre frames completos (resincroniza clientes)
+STALE_AGE = 2.0             # s, más viejo que esto no se publica
+
+Render = Callable[[int, Reading], Dict[str, object]]
+
+
+class Subscription:
+    def __init__(self, ids:Iterable[int], fields:Optional[Iterable[str]]=None,
+                 rate:float=MAX_RATE):
+        self.update(ids, fields, rate)
+
+    def update(self, ids:Iterable[int], fields:Optional[Iterable[str]]=None,
+               rate:float=MAX_RATE):
+        # todo se valida antes de asignar: un mensaje malo no deja la suscripción a medias
+        new_ids    = [i for i in ids if 1<=i<=253]
+        new_fields = set(fields) if fields else None                        # None = todos
+        if not math.isfinite(rate): raise ValueError("rate must be finite")   # NaN pasa min/max
+        new_rate   = min(max(rate, 0.5), MAX_RATE)
+        self.ids, self.fields, self.rate = new_ids, new_fields, new_rate
+        self.reset  = True                        # próximo frame completo
+
+
+class TelemetryStream:
+    """Generador de frames delta para una suscripción."""
+
+    def __init__(self, poller:TelemetryPoller, render:Render, sub:Subscription):
+        self.poller, self.render, self.sub = poller, render, sub
+        self._last: Dict[int, Dict[str, object]] = {}
+        self._version  = -1
+        self._keyframe = 0.0
+        self.seq = 0
+
+    def next_frame(self) -> Optional[Dict[str, object]]:
+        """Frame con los campos cambiados, o None si no hay nada nuevo."""
+        version, now = self.poller.version, time.monotonic()
+        full = self.sub.reset or now - self._keyframe >= KEYFRAME
+        if version == self._version and not full: return None
+        self._version = version
+        if full:
+            self._last, self._keyframe, self.sub.reset = {}, now, False
+
+        servos: Dict[int, Dict[str, object]] = {}
+        for sid in self.sub.ids:
+            hit = self.poller.get(sid, STALE_AGE)
+            if hit is None: continue
+            state = self.render(sid, hit[0])
+            if self.sub.fields is not None:
+                state = {k:v for k,v in state.items() if k in self.sub.fields}
+            prev  = self._last.setdefault(sid, {})
+            delta = {k:v for k,v in state.items() if prev.get(k, ...) != v}
+            if delta:
+                prev.update(delta); servos[sid] = delta
+        if not servos and not full: return None
+        self.seq += 1
+        return {"seq":self.seq, "t":time.time(), "full":full, "servos":servos}
+
+    async def frames(self, alive:Callable[[], bool]=lambda: True):
+        """Async-gen a `sub.rate` Hz; el consumidor marca el ritmo (conflación)."""
+        while alive():
+            t0 = time.monotonic()
+            frame = self.next_frame()
+            if frame is not None: yield frame
+            await asyncio.sleep(max(0.0, 1.0/self.sub.rate - (time.monotonic()-t0)))
+
+
+def parse_sub(ids:str, fields:str, rate:float) -> Subscription:
+    id_list: List[int] = [int(i) for i in ids.split(",") if i.strip()]
+    return Subscription(id_list, [f for f in fields.split(",") if f] or None, rate)
+
+
+def sse_event(frame:Dict[str, object]) -> str:
+    return f"id: {frame['seq']}\ndata: {json.dumps(frame, separators=(',',':'))}\n\n"
@@ -0,0 +1,132 @@
+"""
+telemetry.py — Adquisición en segundo plano
+Una única tarea asyncio barre los IDs configurados a ritmo fijo y guarda el último
+valor de cada campo con su timestamp. Los endpoints leen de esta foto en
+memoria, así que la carga del bus ya no depende de cuántas pestañas haya
+abiertas.
+────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio, logging, time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from dxl_bus import BusUnavailable
+
+log = logging.getLogger("dxl.telemetry")
+
+Reading = Dict[str, Optional[int]]          # campo → valor crudo (None = sin dato)
+ReadMany = Callable[[List[int]], Awaitable[Dict[int, Optional[Reading]]]]
+
+
+class TelemetryPoller:
+    def __init__(self, read:Callable[[int], Awaitable[Optional[Reading]]],
+                 ids:Iterable[int], rate_hz:float=5.0,
+                 read_many:Optional[ReadMany]=None,
+                 partition:Callable[[List[int]], List[List[int]]]=lambda ids: [ids]):
+        self.read, self.ids, self.rate_hz = read, list(ids), rate_hz
+        self.read_many = read_many                # barrido de todos los IDs de una vez (BULK_READ)
+        self.partition = partition                # grupos que se barren en paralelo (uno por bus)
+        self.listeners: List[Callable[[int, Reading, float], None]] = []   # p. ej. el historial
+        self._snap: Dict[int, Dict[str, Tuple[int, float]]] = {}   # sid → campo → (valor, ts)
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.version = 0                          # +1 en cada update (lo usa el streaming)
+        self.sweeps = self.overruns = self.bus_errors = 0   # sweeps: solo los que llegaron al bus
+        self._unreached: Set[int] = set()         # IDs que el último barrido no pudo leer (sin bus)
+        self.last_sweep_s = 0.0
+
+    # ---------- foto compartida ----------
+    def update(self, sid:int, values:Optional[Reading], ts:Optional[float]=None):
+        """Guarda los campos con dato; los que vienen en None conservan el valor anterior."""
+        if not values: return
+        ts  = time.time() if ts is None else ts
+        cur = self._snap.setdefault(sid, {})
+        for k,v in values.items():
+            if v is not None: cur[k] = (v, ts)
+        self.version += 1
+        for fn in self.listeners: fn(sid, values, ts)
+
+    def get(self, sid:int, max_age:float,
+            key:str="PRESENT_POSITION") -> Optional[Tuple[Reading, float]]:
+        """(valores, edad_s) si `key` es más reciente que `max_age`; si no None."""
+        cur = self._snap.get(sid)
+        if not cur or key not in cur: return None
+        age = time.time() - cur[key][1]
+        if age > max_age: return None
+        return {k:v for k,(v,_) in cur.items()}, age
+
+    def covers(self, sid:int, max_age:float) -> bool:
+        """True si el barrido ya entrega `sid` con esa frescura (no hace falta ir al bus)."""
+        return (self._task is not None and sid in self.ids and self.sweeps > 0
+                and max_age >= 1.0/self.rate_hz and sid not in self._unreached)
+
+    def timestamps(self, sid:int) -> Dict[str, float]:
+        return {k:ts for k,(_,ts) in self._snap.get(sid, {}).items()}
+
+    def ages(self, sid:int) -> Dict[str, float]:
+        """Edad (s) de cada campo en la foto: no todos vienen del mismo barrido."""
+        now = time.time()
+        return {k:round(now - ts, 3) for k,ts in self.timestamps(sid).items()}
+
+    # ---------- tarea ----------
+    def start(self):
+        if self._task or self.rate_hz <= 0 or not self.ids: return
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="dxl-poller")
+
+    async def stop(self):
+        if self._task is None: return
+        self._task.cancel()
+        try:    await self._task
+        except asyncio.CancelledError: pass
+        self._task = None
+
+    async def _run(self):
+        period = 1.0 / self.rate_hz
+        next_t = time.monotonic()
+        while True:
+            t0 = time.monotonic()
+            if self.read_many is not None: await self._sweep_many()
+            else:                          await self._sweep()
+            if len(self._unreached) < len(self.ids): self.sweeps += 1
+            self.last_sweep_s = time.monotonic() - t0
+            next_t += period
+            delay = next_t - time.monotonic()
+            if delay < 0:                        # barrido más lento que el periodo
+                self.overruns += 1
+                next_t, delay = time.monotonic(), 0.0
+            await asyncio.sleep(delay)
+
+    async def _sweep(self):
+        self._unreached.clear()
+        await asyncio.gather(*(self._sweep_ids(g) for g in self.partition(self.ids)))
+
+    async def _sweep_ids(self, ids:List[int]):
+        for k, sid in enumerate(ids):
+            try:
+                self.update(sid, await self.read(sid))
+            except BusUnavailable:
+                self.bus_errors += 1
+                self._unreached.update(ids[k:])
+                break                            # sin bus no tiene sentido seguir el barrido
+            except Exception:
+                log.exception("error leyendo servo %s", sid)
+
+    async def _sweep_many(self):
+        self._unreached.clear()
+        try:
+            for sid, values in (await self.read_many(self.ids)).items():
+                self.update(sid, values)
+        except BusUnavailable:
+            self.bus_errors += 1
+            self._unreached.update(self.ids)
+        except Exception:
+            log.exception("error en el barrido de %s", self.ids)
+
+    def stats(self) -> Dict[str, object]:
+        return {"ids":self.ids, "rate_hz":self.rate_hz, "running":self._task is not None,
+                "bulk":self.read_many is not None,
+                "sweeps":self.sweeps, "overruns":self.overruns,
+                "bus_errors":self.bus_errors, "last_sweep_ms":round(self.last_sweep_s*1e3,2)}
+
+
+def parse_ids(csv:str) -> List[int]:
+    return [i for i in map(int, csv.split(",")) if 1<=i<=253] if csv.strip() else []
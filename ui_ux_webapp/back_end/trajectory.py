@@ -0,0 +1,204 @@
+"""
+trajectory.py — Trayectorias articulares parametrizadas en el tiempo
+plan_trajectory() precalcula (una sola pasada vectorizada con NumPy) el
+perfil min-jerk o trapezoidal de todos los segmentos, ya muestreado a la
+frecuencia del lazo y convertido a unidades Dynamixel. TrajectoryRunner
+envía cada setpoint con un SYNC_WRITE a ritmo fijo, mide jitter/deadlines
+perdidos y permite reemplazar la trayectoria en marcha (con o sin blend).
+────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio, logging, math, time
+from typing import Awaitable, Callable, Dict, Optional, Sequence, Tuple
+import numpy as np
+
+log = logging.getLogger("dxl.trajectory")
+
+UNITS_PER_DEG = 1023 / 300           # Goal Position (AX/MX 10 bits)
+DPS_PER_UNIT  = 0.111 * 6            # Moving Speed: 0.111 rpm = 0.666 °/s
+TRAP_ACCEL    = 0.25                 # fracción del segmento en rampa (trapezoidal)
+PEAK = {"minjerk": 1.875, "trapezoid": 1/(1-TRAP_ACCEL)}   # v_max / v_media
+MAX_DURATION  = 300.0                # s por trayectoria (acota memoria: ≤ 30 000 muestras a 100 Hz)
+
+# el último argumento es la época de start(): el bus descarta lo enviado tras un stop
+Send = Callable[[Sequence[int], np.ndarray, np.ndarray, Optional[int]], Awaitable[None]]
+Release = Callable[[Sequence[int], Optional[int]], Awaitable[None]]
+
+
+# ───────────── Perfiles normalizados s(u), u∈[0,1] ─────────────
+def _minjerk(u:np.ndarray) -> np.ndarray:
+    return u**3 * (10 - 15*u + 6*u**2)
+
+def _trapezoid(u:np.ndarray, f:float=TRAP_ACCEL) -> np.ndarray:
+    vp = 1/(1-f)
+    return np.where(u < f, vp*u**2/(2*f),
+           np.where(u <= 1-f, vp*(u - f/2), 1 - vp*(1-u)**2/(2*f)))
+
+PROFILES = {"minjerk": _minjerk, "trapezoid": _trapezoid}
+
+
+class Trajectory:
+    """Muestras a `rate` Hz: q (N×J, grados), goal/speed (N×J, unidades DXL)."""
+    __slots__ = ("ids", "rate", "t", "q", "goal", "speed")
+
+    def __init__(self, ids:Sequence[int], rate:float, t:np.ndarray, q:np.ndarray):
+        self.ids, self.rate, self.t, self.q = list(ids), rate, t, q
+        self.goal = np.rint(q * UNITS_PER_DEG).astype(np.uint16)
+        dps = np.abs(np.gradient(q, 1/rate, axis=0)) if len(q) > 1 else np.zeros_like(q)
+        # 0 = "sin límite" en Moving Speed → nunca mandar 0
+        self.speed = np.clip(np.rint(dps / DPS_PER_UNIT), 1, 1023).astype(np.uint16)
+
+    @property
+    def duration(self) -> float: return float(self.t[-1])
+
+
+def plan_trajectory(ids:Sequence[int], start:Sequence[float],
+                    waypoints:Sequence[Tuple[Sequence[float], Optional[float]]],
+                    rate:float=50.0, vmax:float=60.0,
+                    profile:str="minjerk") -> Trajectory:
+    """start + [(ángulos, duración|None), ...] → Trajectory muestreada.
+    Sin duración, el segmento dura lo justo para no superar `vmax` (°/s)
+    en la junta que más recorre. ValueError si rate/vmax/duraciones no son
+    finitos y positivos o si el total supera MAX_DURATION."""
+    if profile not in PROFILES: raise ValueError(f"profile must be one of {list(PROFILES)}")
+    if not (math.isfinite(rate) and rate > 0): raise ValueError("rate must be finite and > 0")
+    if not (math.isfinite(vmax) and vmax > 0): raise ValueError("vmax must be finite and > 0")
+    if any(d is not None and not (math.isfinite(d) and d > 0) for _,d in waypoints):
+        raise ValueError("duration must be finite and > 0")
+    q  = np.asarray([start] + [w for w,_ in waypoints], dtype=float)      # (S+1)×J
+    dq = np.diff(q, axis=0)
+    dur = np.array([d if d is not None else 0.0 for _,d in waypoints], dtype=float)
+    need = PEAK[profile] * np.abs(dq).max(axis=1) / vmax                  # límite de velocidad
+    dur  = np.where(dur > 0, dur, np.maximum(need, 1/rate))
+    ends = np.cumsum(dur)
+    if not np.isfinite(q).all(): raise ValueError("angles must be finite")
+    if not ends[-1] <= MAX_DURATION:        # antes de np.arange: vmax ínfimo → GB de muestras
+        raise ValueError(f"trajectory longer than {MAX_DURATION:g} s")
+
+    t    = np.arange(0.0, ends[-1] + 0.5/rate, 1/rate)
+    seg  = np.minimum(np.searchsorted(ends, t, side="right"), len(dur)-1)
+    u    = np.clip((t - (ends[seg] - dur[seg])) / dur[seg], 0.0, 1.0)
+    s    = PROFILES[profile](u)
+    return Trajectory(ids, rate, t, q[seg] + dq[seg] * s[:, None])
+
+
+# ───────────── Estadísticas del lazo ─────────────
+class LoopStats:
+    def __init__(self, size:int=2048):
+        self._jit  = np.zeros(size)                  # ring de retrasos (s)
+        self._send = np.zeros(size)                  # ring de duración del envío (s)
+        self.ticks = self.missed = 0
+
+    def record(self, late:float, send:float):
+        i = self.ticks % len(self._jit)
+        self._jit[i], self._send[i] = late, send
+        self.ticks += 1
+
+    def summary(self) -> Dict[str, float]:
+        n = min(self.ticks, len(self._jit))
+        if not n: return {"ticks":0, "missed":self.missed}
+        j, s = self._jit[:n]*1e3, self._send[:n]*1e3
+        return {"ticks":self.ticks, "missed":self.missed,
+                "jitter_ms_mean":round(float(j.mean()),3),
+                "jitter_ms_p99": round(float(np.percentile(j, 99)),3),
+                "jitter_ms_max": round(float(j.max()),3),
+                "send_ms_mean":  round(float(s.mean()),3),
+                "send_ms_max":   round(float(s.max()),3)}
+
+
+# ───────────── Lazo en tiempo real ─────────────
+class TrajectoryRunner:
+    def __init__(self, send:Send, release:Optional[Release]=None):
+        self.send  = send
+        self.release = release       # al terminar o cancelar (no al reemplazar): p. ej. Moving Speed
+        self.stats = LoopStats()
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._traj: Optional[Trajectory] = None
+        self._t0 = 0.0
+        self._k  = 0
+        self._last: Optional[np.ndarray] = None     # último setpoint enviado (°)
+        self._blend: Optional[Tuple[Trajectory, float, float, float]] = None   # (vieja, t0, inicio, dur)
+
+    @property
+    def running(self) -> bool: return self._task is not None and not self._task.done()
+
+    def current(self) -> Optional[Dict[int, float]]:
+        """Último setpoint enviado (°) por ID, para encadenar trayectorias."""
+        if self._traj is None or self._last is None: return None
+        return dict(zip(self._traj.ids, self._last.tolist()))
+
+    def start(self, traj:Trajectory, blend_s:float=0.0, epoch:Optional[int]=None):
+        """Arranca `traj`; si hay otra en marcha la reemplaza (blend_s > 0 → mezcla).
+        `epoch` viaja con cada setpoint y con el release final."""
+        now = time.monotonic()
+        if self.running and blend_s > 0 and self._traj is not None \
+                and self._traj.ids == traj.ids:
+            self._blend = (self._traj, self._t0, now, blend_s)
+        else:
+            self._blend = None
+        self.cancel()
+        self._traj, self._t0, self._k = traj, now, 0
+        self._task = asyncio.get_running_loop().create_task(self._run(traj, epoch), name="dxl-trajectory")
+
+    def cancel(self):
+        if self._task is not None: self._task.cancel()
+        self._task = None
+
+    def status(self) -> Dict[str, object]:
+        tr = self._traj
+        return {"running":self.running,
+                "ids":tr.ids if tr else [],
+                "duration_s":round(tr.duration,3) if tr else 0.0,
+                "progress":round(self._k/max(1, len(tr.t)-1),3) if tr else 0.0,
+                "loop":self.stats.summary()}
+
+    # ---------- internos ----------
+    def _idx(self, tr:Trajectory, t0:float, now:float) -> int:
+        return min(len(tr.t)-1, max(0, int(round((now - t0) * tr.rate))))
+
+    def _q_at(self, now:float) -> np.ndarray:
+        """Setpoint (°) en `now`, mezclando con la trayectoria anterior si hay blend."""
+        tr = self._traj
+        q  = tr.q[self._idx(tr, self._t0, now)]
+        if self._blend is not None:
+            old, t0_old, tb, dur = self._blend
+            u = (now - tb) / dur
+            if u >= 1: self._blend = None
+            else:
+                w = float(_minjerk(np.array(max(u, 0.0))))
+                q = (1-w) * old.q[self._idx(old, t0_old, now)] + w * q
+        return q
+
+    def _setpoint(self, k:int, now:float) -> Tuple[np.ndarray, np.ndarray]:
+        tr = self._traj
+        if self._blend is None:
+            self._last = tr.q[k]
+            return tr.goal[k], tr.speed[k]
+        self._last = q = self._q_at(now)
+        return np.rint(q * UNITS_PER_DEG).astype(np.uint16), tr.speed[k]
+
+    async def _run(self, tr:Trajectory, epoch:Optional[int]):
+        dt, n, k = 1/tr.rate, len(tr.t), 0
+        try:
+            while k < n:
+                deadline = self._t0 + k*dt
+                delay = deadline - time.monotonic()
+                if delay > 0: await asyncio.sleep(delay)
+                now  = time.monotonic()
+                late = now - deadline
+                if late >= dt:                       # periodo(s) perdidos: saltar al presente
+                    skip = int(late / dt)
+                    self.stats.missed += skip
+                    k = min(n-1, k + skip)
+                goal, speed = self._setpoint(k, now)
+                await self.send(tr.ids, goal, speed, epoch)
+                self.stats.record(late, time.monotonic() - now)
+                self._k = k; k += 1
+        except Exception:
+            log.exception("trayectoria abortada en la muestra %d", k)
+        finally:
+            # la última muestra deja Moving Speed casi en 0; si otra trayectoria
+            # tomó el relevo, ella manda su propia velocidad en cada muestra
+            if self._traj is tr and self.release is not None:
+                try:    await self.release(tr.ids, epoch)
+                except Exception: log.exception("no se pudo liberar %s", tr.ids)
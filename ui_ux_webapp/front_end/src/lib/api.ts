@@ -20,15 +20,30 @@ export interface InspectData {
   status_return_level:   number | null;
 }
 
+export interface MoveTarget {
+  id:     number;
+  angle:  number;
+  speed?: number;                          // RPM (0 = máx.)
+}
+
 export const api = {
   /* ----- movimientos ----- */
+  /** Encola la meta (el backend coalesce: gana la última por servo) */
   move:   (id: number, angle: number) =>
-    j<{ servo_id: number; angle_deg: number }>(`${BASE}/move`, {
+    j<{ servo_id: number; angle_deg: number; seq: number; done_seq: number }>(`${BASE}/move`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ id, angle }),
     }),
 
+  /** Varios servos en un solo SYNC_WRITE (o REG_WRITE + ACTION) */
+  moveBatch: (targets: MoveTarget[], mode: "sync" | "action" = "sync") =>
+    j<{ targets: MoveTarget[]; mode: string; packets: number }>(`${BASE}/move/batch`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ targets, mode }),
+    }),
+
   stop:   () => j<{ status: string }>(`${BASE}/stop`,   { method: "POST" }),
   resume: () => j<{ status: string }>(`${BASE}/resume`, { method: "POST" }),
   reset:  () => j<{ status: string }>(`${BASE}/reset`,  { method: "POST" }),
@@ -53,3 +68,44 @@ torque: (id: number, enable: boolean) =>
   }),
 
 };
+
+/* ---------- Telemetría en streaming ---------- */
+export interface TelemetryFrame {
+  seq:    number;
+  t:      number;
+  full:   boolean;                               // true → estado completo
+  servos: Record<string, Partial<InspectData>>;  // solo campos que cambiaron
+}
+
+/** Se suscribe a /ws/telemetry (SSE si el WebSocket no está disponible),
+    aplica los deltas y entrega el estado completo. Devuelve el "unsubscribe". */
+export function subscribeTelemetry(
+  ids: number[],
+  onData: (data: InspectData[]) => void,
+  rate = 20,
+): () => void {
+  const state = new Map<number, InspectData>();
+  const qs = `ids=${ids.join(",")}&rate=${rate}`;
+  let closed = false;
+  let es: EventSource | null = null;
+
+  const apply = (f: TelemetryFrame) => {
+    if (f.full) state.clear();
+    for (const [sid, delta] of Object.entries(f.servos)) {
+      const id = Number(sid);
+      state.set(id, { ...(state.get(id) ?? { servo_id: id }), ...delta } as InspectData);
+    }
+    onData([...state.values()]);
+  };
+
+  const wsUrl = BASE.replace(/^http/, "ws").replace(/\/api\/?$/, "");
+  const ws = new WebSocket(`${wsUrl}/ws/telemetry?${qs}`);
+  ws.onmessage = e => apply(JSON.parse(e.data));
+  ws.onclose   = () => {                     // fallback: SSE (reconecta solo)
+    if (closed || es) return;
+    es = new EventSource(`${BASE}/telemetry/stream?${qs}`);
+    es.onmessage = e => apply(JSON.parse(e.data));
+  };
+
+  return () => { closed = true; ws.close(); es?.close(); };
+}
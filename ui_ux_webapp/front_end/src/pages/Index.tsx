@@ -12,7 +12,7 @@ import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { Button } from "@/components/ui/button";
 import { Sparkle } from "lucide-react";
 
-import { api, InspectData } from "@/lib/api";
+import { api, InspectData, subscribeTelemetry } from "@/lib/api";
 import { jointToServo } from "@/lib/utils";
 
 /* ─────── Tipos ─────── */
@@ -90,31 +90,34 @@ const Index: React.FC = () => {
     log("Preset 80-64-64-120", "completado");
   };
 
-  /* ── Polling de servos ── */
+  /* ── Telemetría de servos ── */
+  const applyInspect = (data: InspectData[]) =>
+    setServos(prev => prev.map(s => {
+      const d = data.find(x => x.servo_id === s.id);
+      if (!d) return s;
+      return {
+        ...s,
+        presentPosition: d.position_deg,
+        moving: Math.abs(d.position_deg - s.goalPosition) > 2,
+        presentSpeed: d.speed_rpm ?? 0,
+        presentLoad: d.load ? parseFloat(d.load) : 0,
+        torqueEnable: d.torque_enabled ?? s.torqueEnable,
+        presentVoltage: d.voltage_v ?? 0,
+        presentTemperature: d.temperature_c ?? 0,
+      };
+    }));
+
+  /* Refresco manual (botón del monitor) */
   const refreshServos = async () => {
     try {
-      const data: InspectData[] = await api.inspectAll(SERVO_IDS);
-      setServos(prev => prev.map(s => {
-        const d = data.find(x => x.servo_id === s.id);
-        if (!d) return s;
-        return {
-          ...s,
-          presentPosition: d.position_deg,
-          moving: Math.abs(d.position_deg - s.goalPosition) > 2,
-          presentSpeed: d.speed_rpm ?? 0,
-          presentLoad: d.load ? parseFloat(d.load) : 0,
-          torqueEnable: d.torque_enabled ?? s.torqueEnable,
-          presentVoltage: d.voltage_v ?? 0,
-          presentTemperature: d.temperature_c ?? 0,
-        };
-      }));
+      applyInspect(await api.inspectAll(SERVO_IDS));
     } catch (err) { console.error("inspectAll", err); }
   };
 
+  /* Streaming: WebSocket con fallback a SSE, sin polling HTTP */
   useEffect(() => {
     refreshServos();
-    const id = setInterval(refreshServos, 1000);
-    return () => clearInterval(id);
+    return subscribeTelemetry(SERVO_IDS, applyInspect);
   }, []);
 
   /* ── Handlers torque / límite ── */